@@ -0,0 +1,364 @@
+# kakaomap_crawler.py
+# 카카오맵 매장 상세 정보 병렬 크롤러 ((본)카카오맵크롤링.ipynb 의 매장별 크롤링을 여러 헤드리스 브라우저로 나눠 실행)
+# 실행: python kakaomap_crawler.py --workers 4
+# 중단된 크롤링은 같은 명령으로 이어서 실행 (완료된 매장은 체크포인트 DB 에서 불러옴)
+# 오래된 매장만 다시 크롤링: python kakaomap_crawler.py --max-age-days 7
+# 오프라인 확인: python kakaomap_crawler.py --fixtures ./fixtures --urls ./fixtures/url.csv --output ./fixtures/result.csv --checkpoint ./fixtures/checkpoint.sqlite3
+#   (fixtures 폴더에 저장해 둔 상세 페이지 HTML 을 장소 번호 파일명으로 두면, 예: ./fixtures/24167977, 로컬 서버에서 크롤링)
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pandas as pd
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from webdriver_manager.chrome import ChromeDriverManager
+
+# 입력 (매장명, 링크) / 출력 CSV 경로
+URL_FILE = './data/url.csv'
+OUTPUT_FILE = './data/kakaomap_starbucks.csv'
+
+# 완료된 매장(상세 페이지 주소별 추출 결과)을 기록하는 체크포인트 DB
+CHECKPOINT_DB = './data/kakaomap_checkpoint.sqlite3'
+
+# 이 기간(일)보다 오래된 매장만 다시 크롤링 (None 이면 체크포인트에 있는 매장은 모두 건너뜀)
+MAX_AGE_DAYS = None
+
+# 동시에 띄울 헤드리스 브라우저 수, 요소가 나타날 때까지 기다릴 최대 시간(초)
+WORKERS = 4
+PAGE_TIMEOUT = 10
+
+# 상세 페이지 주소의 호스트를 바꿀 주소 (None 이면 카카오맵 그대로, 로컬 HTML 서버로 테스트할 때 지정)
+BASE_URL = None
+
+# 출력 CSV 컬럼 (노트북 결과와 동일)
+COLUMNS = ['지점명', '평점', '평점 카운트', '리뷰 개수', '가능 여부', '시설 정보', '영업시간', '분위기', '맛', '친절', '가성비', '주차']
+
+# 상세 페이지 요소 선택자
+RATING_SELECTOR = '#mArticle > div.cont_essential > div:nth-child(1) > div.place_details > div > div.location_evaluation > a:nth-child(3) > span.color_b'
+RATING_COUNT_SELECTOR = '#mArticle > div.cont_evaluation > strong.total_evaluation > span'
+REVIEW_COUNT_SELECTOR = '#mArticle > div.cont_essential > div:nth-child(1) > div.place_details > div > div.location_evaluation > a:nth-child(5) > span'
+AVAILABILITY_SELECTOR = '#mArticle > div.cont_essential > div.details_placeinfo > div:nth-child(7) > div'
+FACILITY_SELECTOR = '#mArticle > div.cont_essential > div.details_placeinfo > div.placeinfo_default.placeinfo_facility > ul > li'
+HOURS_BUTTON_SELECTOR = '#mArticle > div.cont_essential > div.details_placeinfo > div:nth-child(3) > div > div.location_present > div > ul > li > a > span'
+HOURS_SELECTOR = '#mArticle > div.cont_essential > div.details_placeinfo > div:nth-child(3) > div > div.fold_floor > div > div > ul > li'
+DISPLAY_PERIOD_SELECTOR = '#mArticle > div.cont_essential > div.details_placeinfo > div:nth-child(3) > div > div.fold_floor > div > div.displayPeriodList > ul > li'
+SIMPLE_HOURS_SELECTOR = '#mArticle > div.cont_essential > div.details_placeinfo > div:nth-child(3) > div > div > div > ul > li > span'
+EVALUATION_SELECTOR = '#mArticle > div.cont_evaluation > div.view_likepoint > span.chip_likepoint'
+
+# 상세 페이지 영역 (영역이 그려질 때까지 기다린 뒤 안의 요소를 읽음)
+PLACEINFO_SELECTOR = '#mArticle > div.cont_essential > div.details_placeinfo'
+EVALUATION_CONTAINER_SELECTOR = '#mArticle > div.cont_evaluation'
+
+# 시설 아이콘 클래스 → (시설 이름, 값)
+FACILITY_ICONS = [
+    ('ico_parking', '주차 공간', '가능'),
+    ('ico_noparking', '주차 공간', '불가능'),
+    ('ico_playroom', '놀이 공간', '가능'),
+    ('ico_noplayroom', '놀이 공간', '불가능'),
+    ('ico_handicapped', '휠체어 접근 가능', '가능'),
+    ('ico_nohandicapped', '휠체어 접근 가능', '불가능'),
+]
+
+# 평가 항목
+EVALUATION_LABELS = ['분위기', '맛', '친절', '가성비', '주차']
+
+
+# 헤드리스 크롬 드라이버 생성 (암묵적 대기 없음: 없는 요소마다 기다리지 않도록 필요한 곳에서만 명시적 대기)
+def make_driver(driver_path=None):
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # GUI 없이 실행
+    chrome_options.add_argument("--no-sandbox")  # 샌드박스 모드 비활성화
+    chrome_options.add_argument("--disable-dev-shm-usage")  # /dev/shm 사용 비활성화
+    return webdriver.Chrome(service=Service(driver_path or ChromeDriverManager().install()), options=chrome_options)
+
+
+# 상세 페이지 주소 (BASE_URL 이 있으면 호스트만 바꿈: https://place.map.kakao.com/24167977 → BASE_URL/24167977)
+def resolve_url(url, base_url=BASE_URL):
+    if not base_url:
+        return url
+    parts = urlsplit(url)
+    return base_url.rstrip('/') + parts.path + (f'?{parts.query}' if parts.query else '') + (f'#{parts.fragment}' if parts.fragment else '')
+
+
+# 선택자에 맞는 첫 요소의 텍스트 (없으면 'N/A')
+def text_or_na(driver, selector):
+    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+    return elements[0].text.strip() if elements else 'N/A'
+
+
+# 빈 결과 행 (오류가 난 매장용)
+def empty_row(store_name):
+    row = {column: 'N/A' for column in COLUMNS}
+    row['지점명'] = store_name
+    return row
+
+
+# 선택자 중 하나에 맞는 요소가 나타날 때까지 대기 (없으면 timeout 후 그대로 진행)
+def wait_for_any(driver, timeout, *selectors):
+    try:
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            *(EC.presence_of_element_located((By.CSS_SELECTOR, selector)) for selector in selectors)
+        ))
+    except TimeoutException:
+        pass
+
+
+# 상세 정보가 나타날 때까지 대기 (노트북의 고정 sleep 대신 영역별 명시적 대기)
+# 평점/리뷰 → 시설/가능 여부/영업시간 영역 → 맨 아래로 스크롤해서 평가 영역 (노트북처럼 스크롤 후 다시 맨 위로)
+def wait_for_details(driver, timeout=PAGE_TIMEOUT):
+    wait_for_any(driver, timeout, RATING_SELECTOR, RATING_COUNT_SELECTOR, REVIEW_COUNT_SELECTOR)
+    wait_for_any(driver, timeout, PLACEINFO_SELECTOR)
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    wait_for_any(driver, timeout, EVALUATION_CONTAINER_SELECTOR)
+    driver.execute_script("window.scrollTo(0, 0);")
+
+
+# 영업시간: 펼침 버튼이 있으면 눌러서 목록이 나타날 때까지 기다린 뒤 읽음
+def read_hours(driver, timeout=PAGE_TIMEOUT):
+    buttons = driver.find_elements(By.CSS_SELECTOR, HOURS_BUTTON_SELECTOR)
+    if not buttons:
+        return text_or_na(driver, SIMPLE_HOURS_SELECTOR)
+
+    buttons[0].click()
+    wait_for_any(driver, timeout, HOURS_SELECTOR, DISPLAY_PERIOD_SELECTOR)
+    hours = ', '.join(element.text.strip() for element in driver.find_elements(By.CSS_SELECTOR, HOURS_SELECTOR))
+    display_period = ', '.join(element.text.strip() for element in driver.find_elements(By.CSS_SELECTOR, DISPLAY_PERIOD_SELECTOR))
+    return display_period or hours
+
+
+# 매장 상세 페이지 한 곳 크롤링 → 출력 CSV 한 행
+def crawl_store(driver, store_name, url, timeout=PAGE_TIMEOUT):
+    driver.get(url)
+    wait_for_details(driver, timeout)
+
+    facilities_info = {}
+    for element in driver.find_elements(By.CSS_SELECTOR, FACILITY_SELECTOR):
+        icons = element.find_elements(By.TAG_NAME, 'span')
+        if not icons:
+            continue
+        icon = icons[0].get_attribute('class') or ''
+        for icon_class, facility, value in FACILITY_ICONS:
+            if icon_class in icon:
+                facilities_info[facility] = value
+                break
+
+    evaluation_data = {label: 'N/A' for label in EVALUATION_LABELS}
+    for element in driver.find_elements(By.CSS_SELECTOR, EVALUATION_SELECTOR):
+        labels = element.find_elements(By.CSS_SELECTOR, 'span.txt_likepoint')
+        counts = element.find_elements(By.CSS_SELECTOR, 'span.num_likepoint')
+        if labels and counts and labels[0].text.strip() in evaluation_data:
+            evaluation_data[labels[0].text.strip()] = counts[0].text.strip()
+
+    return {
+        '지점명': store_name,
+        '평점': text_or_na(driver, RATING_SELECTOR),
+        '평점 카운트': text_or_na(driver, RATING_COUNT_SELECTOR),
+        '리뷰 개수': text_or_na(driver, REVIEW_COUNT_SELECTOR),
+        '가능 여부': text_or_na(driver, AVAILABILITY_SELECTOR),
+        '시설 정보': ', '.join([f"{key}: {value}" for key, value in facilities_info.items()]),
+        '영업시간': read_hours(driver, timeout),
+        **evaluation_data,
+    }
+
+
+# 브라우저 종료 (이미 죽은 브라우저의 종료 오류는 무시)
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+# 워커 스레드: 브라우저 하나를 띄워 작업 큐의 매장을 차례로 크롤링하고 결과 큐에 넣음
+# 브라우저가 죽으면 닫고 다음 매장에서 새로 띄움 (띄우기에 실패한 매장은 실패로 기록하고 다음 매장에서 다시 시도)
+def crawl_worker(tasks, results, base_url, timeout, driver_path):
+    driver = None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            index, store_name, url = task
+            completed = False
+            try:
+                if driver is None:
+                    driver = make_driver(driver_path)
+                row = crawl_store(driver, store_name, resolve_url(url, base_url), timeout)
+                completed = True
+            except WebDriverException as e:
+                print(f"Error occurred at {url}: {e}")
+                row = empty_row(store_name)
+                if driver is not None:
+                    quit_driver(driver)
+                    driver = None
+            except Exception as e:
+                print(f"Error occurred at {url}: {e}")
+                row = empty_row(store_name)
+            results.put((index, url, row, completed))
+    finally:
+        if driver is not None:
+            quit_driver(driver)
+
+
+# 크롤링 체크포인트: 완료된 상세 페이지 주소별 추출 결과와 크롤링 시각 (오류가 난 매장은 기록하지 않음)
+# 결과 행은 매장이 끝날 때마다 바로 커밋되므로, 크롤링이 중간에 죽어도 완료된 매장은 남음
+class CrawlCheckpoint:
+    def __init__(self, path=CHECKPOINT_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, store_name TEXT, crawled REAL, row TEXT)')
+        self.connection.commit()
+
+    def save(self, url, row):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO pages (url, store_name, crawled, row) VALUES (?, ?, ?, ?)',
+            (url, row['지점명'], time.time(), json.dumps(row, ensure_ascii=False)),
+        )
+        self.connection.commit()
+
+    # 완료된 매장 {주소: (크롤링 시각, 결과 행)}
+    def load(self):
+        return {url: (crawled, json.loads(row)) for url, crawled, row in self.connection.execute('SELECT url, crawled, row FROM pages')}
+
+    def close(self):
+        self.connection.close()
+
+
+# 결과 행을 CSV 에 바로 이어 씀 (파일이 없으면 헤더부터)
+def append_row(output_path, row):
+    write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    pd.DataFrame([row], columns=COLUMNS).to_csv(output_path, mode='a', header=write_header, index=False, encoding='utf-8')
+
+
+# 입력 순서대로 결과 CSV 저장 (rows: 입력 행 번호 → 결과 행, 없는 매장은 제외)
+def write_rows(output_path, rows):
+    pd.DataFrame([rows[index] for index in sorted(rows)], columns=COLUMNS).to_csv(output_path, index=False, encoding='utf-8')
+
+
+# 매장 목록 병렬 크롤링: 결과는 끝나는 대로 output_path 에 한 행씩 추가하고, 모두 끝나면 입력 순서로 다시 저장
+# 체크포인트에 있는 매장은 건너뜀 (max_age_days 가 있으면 그보다 오래된 매장만 다시 크롤링)
+# 반환: (이번에 크롤링한 매장 수, 체크포인트에서 재사용한 매장 수)
+def crawl(stores, output_path=OUTPUT_FILE, workers=WORKERS, base_url=BASE_URL, timeout=PAGE_TIMEOUT, driver_path=None,
+          checkpoint_path=CHECKPOINT_DB, max_age_days=MAX_AGE_DAYS):
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    checkpoint = CrawlCheckpoint(checkpoint_path)
+    completed = checkpoint.load()
+    oldest = time.time() - max_age_days * 24 * 3600 if max_age_days is not None else None
+
+    rows = {}
+    pending = []
+    for index, (store_name, url) in enumerate(stores):
+        if url in completed and (oldest is None or completed[url][0] >= oldest):
+            rows[index] = {**completed[url][1], '지점명': store_name}
+        else:
+            pending.append((index, store_name, url))
+    reused = len(rows)
+    print(f"체크포인트에서 {reused}곳 재사용, {len(pending)}곳 크롤링")
+
+    # 재사용한 매장부터 CSV 에 쓰고, 새로 크롤링한 매장은 그 뒤에 이어 씀
+    write_rows(output_path, rows)
+    if not pending:
+        checkpoint.close()
+        return 0, reused
+
+    # 드라이버 경로는 한 번만 확인 (워커마다 ChromeDriverManager 를 동시에 호출하지 않도록)
+    driver_path = driver_path or ChromeDriverManager().install()
+    tasks = queue.Queue()
+    results = queue.Queue()
+    for task in pending:
+        tasks.put(task)
+    workers = max(1, min(workers, len(pending)))
+    for _ in range(workers):
+        tasks.put(None)
+
+    threads = [
+        threading.Thread(target=crawl_worker, args=(tasks, results, base_url, timeout, driver_path), daemon=True)
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    crawled = 0
+    start_time = time.time()
+    try:
+        while crawled < len(pending):
+            try:
+                index, url, row, ok = results.get(timeout=1)
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in threads):
+                    print("모든 브라우저가 종료되어 크롤링을 중단합니다.")
+                    break
+                continue
+            if ok:
+                checkpoint.save(url, row)
+            elif url in completed:
+                row = {**completed[url][1], '지점명': row['지점명']}  # 다시 크롤링하다 실패하면 이전 결과 유지
+            append_row(output_path, row)
+            rows[index] = row
+            crawled += 1
+            print(f"크롤링 진행: {crawled}/{len(pending)} ({crawled / (time.time() - start_time):.2f}곳/초) {row['지점명']}")
+
+        for thread in threads:
+            thread.join()
+    finally:
+        checkpoint.close()
+
+    # 입력(url.csv) 순서로 다시 저장
+    write_rows(output_path, rows)
+    return crawled, reused
+
+
+# 확장자 없는 파일(장소 번호)도 HTML 로 응답하는 정적 파일 핸들러
+class FixtureHandler(SimpleHTTPRequestHandler):
+    extensions_map = {**SimpleHTTPRequestHandler.extensions_map, '': 'text/html'}
+
+    def log_message(self, format, *args):
+        pass
+
+
+# 저장해 둔 상세 페이지 HTML 폴더를 로컬 HTTP 서버로 제공 → (서버, 서버 주소)
+def serve_fixtures(directory, host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), partial(FixtureHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="카카오맵 매장 상세 정보 병렬 크롤링")
+    parser.add_argument('--urls', default=URL_FILE)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--timeout', type=float, default=PAGE_TIMEOUT)
+    parser.add_argument('--base-url', default=BASE_URL, help="상세 페이지 호스트를 바꿀 주소 (로컬 HTML 서버)")
+    parser.add_argument('--fixtures', help="저장된 상세 페이지 HTML 폴더 (로컬 HTTP 서버로 띄워서 크롤링)")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_DB)
+    parser.add_argument('--max-age-days', type=float, default=MAX_AGE_DAYS, help="이 기간보다 오래된 매장만 다시 크롤링 (0 이면 전체)")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if args.fixtures:
+        port = urlsplit(base_url).port if base_url else 8765
+        server, base_url = serve_fixtures(args.fixtures, port=port)
+
+    df = pd.read_csv(args.urls, encoding='utf-8')
+    start_time = time.time()
+    crawled, reused = crawl(
+        list(zip(df['매장명'], df['링크'])), args.output, args.workers, base_url, args.timeout,
+        checkpoint_path=args.checkpoint, max_age_days=args.max_age_days,
+    )
+    print(f"매장 {crawled + reused}곳(새로 크롤링 {crawled}곳)의 추가 정보가 {args.output} 파일에 저장되었습니다. ({time.time() - start_time:.2f}초)")
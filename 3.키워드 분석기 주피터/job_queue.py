@@ -0,0 +1,196 @@
+# job_queue.py
+# 큰 업로드 분석을 백그라운드 작업으로 실행: 작업 상태는 SQLite, 결과는 CSV 파일로 저장
+# 분석은 별도 워커 프로세스에서 실행되므로 API 서버의 이벤트 루프는 막히지 않음
+
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import pandas as pd
+
+from keyword_analysis import analyze_frame, file_stopwords
+from noun_extractor import warm_up
+
+# 작업 상태 DB 경로, 동시에 실행할 작업(워커 프로세스) 수, 진행 상황을 기록할 행 단위
+JOB_DB = './uploads/jobs.sqlite3'
+JOB_WORKERS = 2
+JOB_CHUNK_ROWS = 200
+
+# 작업 상태: queued → running → done / failed, done → expired (결과 파일 보관 시간이 지나 삭제됨)
+JOB_STATUSES = ('queued', 'running', 'done', 'failed', 'expired')
+
+
+# 작업을 제출한 서버 프로세스가 살아 있는지 확인 (owner: 프로세스 번호)
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# 작업 상태 저장소 (프로세스마다 연결을 새로 열어 사용, WAL 로 읽기와 쓰기를 동시에)
+# owner: 작업을 워커 풀에 제출한 서버 프로세스 번호 (재시작 시 한 프로세스만 다시 실행하도록)
+class JobStore:
+    def __init__(self, path=JOB_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, action TEXT, status TEXT, rows_done INTEGER DEFAULT 0, '
+                'created REAL, started REAL, finished REAL, error TEXT, owner INTEGER)'
+            )
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(jobs)')]
+            if 'owner' not in columns:
+                connection.execute('ALTER TABLE jobs ADD COLUMN owner INTEGER')  # 이전 버전에서 만든 DB
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _update(self, job_id, **fields):
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self._connect() as connection:
+            connection.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def create(self, job_id, action, owner=None):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO jobs (id, action, status, created, owner) VALUES (?, ?, ?, ?, ?)',
+                (job_id, action, 'queued', time.time(), owner),
+            )
+
+    def start(self, job_id):
+        self._update(job_id, status='running', started=time.time(), rows_done=0, error=None)
+
+    def progress(self, job_id, rows_done):
+        self._update(job_id, rows_done=rows_done)
+
+    def finish(self, job_id):
+        self._update(job_id, status='done', finished=time.time())
+
+    def fail(self, job_id, error):
+        self._update(job_id, status='failed', finished=time.time(), error=error)
+
+    def requeue(self, job_id):
+        self._update(job_id, status='queued', started=None, rows_done=0)
+
+    # 끝나지 않은 작업의 주인을 previous_owner 에서 owner 로 원자적으로 변경 (다른 프로세스가 먼저 가져갔으면 False)
+    def claim(self, job_id, previous_owner, owner):
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET owner = ? WHERE id = ? AND status IN ('queued', 'running') AND owner IS ?",
+                (owner, job_id, previous_owner),
+            )
+        return cursor.rowcount == 1
+
+    def expire(self, job_id):
+        self._update(job_id, status='expired')
+
+    # 작업 상태 (없으면 None): 처리한 행 수, 초당 처리 행 수, 경과 시간 포함
+    def get(self, job_id):
+        with self._connect() as connection:
+            connection.row_factory = sqlite3.Row
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        if job['started']:
+            elapsed = (job['finished'] or time.time()) - job['started']
+            job['elapsed'] = elapsed
+            job['rows_per_sec'] = job['rows_done'] / elapsed if elapsed > 0 else 0.0
+        return job
+
+    # 끝나지 않은 작업 목록 (id, action, owner)
+    def unfinished(self):
+        with self._connect() as connection:
+            rows = connection.execute("SELECT id, action, owner FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        return rows
+
+
+# 워커 프로세스: 업로드 파일을 조각 단위로 분석해 결과 CSV 에 이어 쓰고, 조각마다 진행 상황 기록
+# 결과는 임시 파일에 쓴 뒤 완료 시 교체 (다운로드 시 중간 결과가 보이지 않음)
+def run_job(job_id, action, source_path, result_path, db_path=JOB_DB, chunk_rows=JOB_CHUNK_ROWS):
+    store = JobStore(db_path)
+    store.start(job_id)
+    try:
+        stopwords = None
+        if action == 'generate-stopwords':
+            stopwords = frozenset(file_stopwords(source_path, chunk_rows))
+
+        rows_done = 0
+        partial_path = result_path + '.part'
+        with open(partial_path, 'w', encoding='utf-8', newline='') as result_file:
+            for number, chunk in enumerate(pd.read_csv(source_path, chunksize=chunk_rows)):
+                analyze_frame(chunk, action, stopwords).to_csv(result_file, index=False, header=number == 0)
+                rows_done += len(chunk)
+                store.progress(job_id, rows_done)
+        os.replace(partial_path, result_path)
+        store.finish(job_id)
+    except Exception as e:
+        store.fail(job_id, repr(e))
+
+
+# 작업 큐: 작업 생성 + 워커 프로세스 풀에 제출
+# spawn: 형태소 분석기(JVM)가 떠 있는 서버 프로세스를 복제하지 않고, 워커마다 분석기를 새로 띄움
+class JobQueue:
+    def __init__(self, db_path=JOB_DB, workers=JOB_WORKERS):
+        self.store = JobStore(db_path)
+        self.owner = os.getpid()
+        self.workers = workers
+        self.pool = self._new_pool()
+        self._pool_lock = threading.Lock()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=warm_up)
+
+    def submit(self, job_id, action, source_path, result_path, requeue=False):
+        if requeue:
+            self.store.requeue(job_id)
+        else:
+            self.store.create(job_id, action, self.owner)
+        with self._pool_lock:
+            try:
+                future = self.pool.submit(run_job, job_id, action, source_path, result_path, self.store.path)
+            except BrokenProcessPool:
+                # 워커 프로세스가 비정상 종료(메모리 부족 등)되어 풀이 깨진 경우: 새 풀을 만들어 다시 제출
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = self._new_pool()
+                future = self.pool.submit(run_job, job_id, action, source_path, result_path, self.store.path)
+        future.add_done_callback(partial(self._job_done, job_id))
+
+    # run_job 밖에서 끝난 작업(워커 프로세스 비정상 종료 등)은 상태가 queued/running 에 남으므로 실패로 기록
+    # 서버 종료로 취소된 작업은 그대로 두어 다음 시작 때 다시 실행
+    def _job_done(self, job_id, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.store.fail(job_id, repr(error))
+
+    # 서버가 중간에 종료되어 끝나지 않은 작업 다시 실행, 다시 실행한 작업 수 반환 (paths(job_id) → (원본 경로, 결과 경로))
+    # uvicorn --workers N 이면 모든 워커가 시작 시 호출하므로, 주인 프로세스가 살아 있는 작업은 건너뛰고
+    # 주인을 원자적으로 바꾼 워커 하나만 제출 (같은 작업이 여러 번 실행되어 결과 파일을 두고 경쟁하지 않도록)
+    def resume(self, paths):
+        resumed = 0
+        for job_id, action, owner in self.store.unfinished():
+            if owner is not None and process_alive(owner):
+                continue
+            if self.store.claim(job_id, owner, self.owner):
+                self.submit(job_id, action, *paths(job_id), requeue=True)
+                resumed += 1
+        return resumed
+
+    def status(self, job_id):
+        return self.store.get(job_id)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,89 @@
+# keyword_analysis.py
+# 키워드 분석 함수 모음 (API 서버와 백그라운드 작업 워커 프로세스가 함께 사용)
+
+import hashlib
+import heapq
+import json
+import os
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+
+import pandas as pd
+
+from noun_extractor import extract_nouns_batch
+
+# 불용어로 고를 상위/하위 명사 비율
+STOPWORD_PERCENT = 0.01
+
+# 파일 내용별로 계산한 불용어 목록 저장 경로 (같은 파일을 다시 올리면 재사용)
+STOPWORDS_DIR = './data/stopwords'
+
+# 형태소 분석 및 명사 추출 함수
+def extract_nouns(text):
+    return extract_nouns_many([text])[0]
+
+# 여러 본문의 명사를 한 번에 추출 (본문별 공백 구분 문자열)
+# 블로그 본문은 길고 거의 반복되지 않으므로 결과를 캐시에 남기지 않음
+def extract_nouns_many(texts):
+    return [' '.join(nouns) for nouns in extract_nouns_batch(texts, memoize=False)]
+
+# 불용어 목록 생성 함수 (nouns: 공백 구분 명사 문자열 또는 행별 문자열 목록)
+def generate_stopwords(nouns, percent=STOPWORD_PERCENT):
+    rows = [nouns] if isinstance(nouns, str) else nouns
+    return stopwords_from_counts(Counter(chain.from_iterable(row.split() for row in rows)), percent)
+
+# 명사 빈도에서 상위 1% / 하위 1% 명사를 불용어로 선택
+# 전체 정렬 대신 힙 선택 (어휘 수 n, 선택 수 k 일 때 O(n log k)), 순서는 most_common 과 동일
+# (상위는 빈도 내림차순·먼저 나온 순, 하위는 빈도 오름차순·나중에 나온 순)
+def stopwords_from_counts(noun_counts, percent=STOPWORD_PERCENT):
+    selected = int(len(noun_counts) * percent)
+    if selected == 0:
+        return []
+    stopwords = [noun for noun, count in heapq.nlargest(selected, noun_counts.items(), key=itemgetter(1))]
+    stopwords += [noun for noun, count in heapq.nsmallest(selected, reversed(noun_counts.items()), key=itemgetter(1))]
+    return stopwords
+
+# 불용어 제거된 명사 추출 함수 (stopwords 는 set 으로 넘기면 명사마다 O(1) 확인)
+def filter_nouns(nouns, stopwords):
+    return ' '.join([noun for noun in nouns.split() if noun not in stopwords])
+
+# 데이터 조각들의 nouns 컬럼 명사 빈도 (한 번 훑으며 누적, 조각마다 Counter.update 1회)
+def count_nouns(chunks):
+    noun_counts = Counter()
+    for chunk in chunks:
+        noun_counts.update(chain.from_iterable(nouns.split() for nouns in chunk['nouns'].fillna('')))
+    return noun_counts
+
+# 불용어 목록 저장 / 불러오기 (JSON 리스트)
+def save_stopwords(path, stopwords):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as stopwords_file:
+        json.dump(stopwords, stopwords_file, ensure_ascii=False)
+
+def load_stopwords(path):
+    with open(path, 'r', encoding='utf-8') as stopwords_file:
+        return json.load(stopwords_file)
+
+# CSV 파일의 불용어: 파일 내용 해시로 저장된 목록이 있으면 재사용, 없으면 nouns 컬럼을 한 번 훑어 계산 후 저장
+def file_stopwords(source_path, chunk_rows, percent=STOPWORD_PERCENT, stopwords_dir=STOPWORDS_DIR):
+    digest = hashlib.md5()
+    with open(source_path, 'rb') as source_file:
+        for block in iter(lambda: source_file.read(1024 * 1024), b''):
+            digest.update(block)
+    path = os.path.join(stopwords_dir, f'{digest.hexdigest()}-{percent}.json')
+    if os.path.exists(path):
+        return load_stopwords(path)
+
+    stopwords = stopwords_from_counts(count_nouns(pd.read_csv(source_path, chunksize=chunk_rows, encoding='utf-8')), percent)
+    save_stopwords(path, stopwords)
+    return stopwords
+
+# 데이터 조각 하나 분석: 'extract-nouns' 는 명사 추출, 'generate-stopwords' 는 주어진 불용어로 명사 필터링
+def analyze_frame(data, action, stopwords=None):
+    if action == 'extract-nouns':
+        data['nouns'] = extract_nouns_many(data['Content'].tolist())
+    else:
+        stopwords = stopwords if isinstance(stopwords, (set, frozenset)) else frozenset(stopwords or ())
+        data['filtered_nouns'] = [filter_nouns(nouns, stopwords) for nouns in data['nouns'].fillna('')]
+    return data
@@ -1,16 +1,22 @@
 # main.py
 
+import os
+import re
+import shutil
+import time
+import uuid
 import nest_asyncio
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.requests import Request
+from starlette.concurrency import run_in_threadpool
 import pandas as pd
-from collections import Counter
 from sklearn.feature_extraction.text import TfidfVectorizer
-from konlpy.tag import Okt
-from io import StringIO
+from noun_extractor import warm_up
+from keyword_analysis import analyze_frame, file_stopwords
+from job_queue import JobQueue
 
 # Jupyter Notebook에서 이벤트 루프를 여러 번 실행할 수 있도록 설정
 nest_asyncio.apply()
@@ -21,54 +27,210 @@ app = FastAPI()
 # Jinja2 템플릿 설정
 templates = Jinja2Templates(directory="templates")
 
-# 형태소 분석기 초기화
-okt = Okt()
-
-# 형태소 분석 및 명사 추출 함수
-def extract_nouns(text):
-    tokens = okt.pos(text)
-    nouns = [word for word, pos in tokens if pos in ['Noun']]
-    return ' '.join(nouns)
-
-# 불용어 목록 생성 함수
-def generate_stopwords(nouns):
-    noun_counts = Counter(nouns.split())
-    total_nouns = len(noun_counts)
-    top_1_percent = int(total_nouns * 0.01)
-    bottom_1_percent = int(total_nouns * 0.01)
-    
-    stopwords = [noun for noun, count in noun_counts.most_common(top_1_percent)]
-    stopwords += [noun for noun, count in noun_counts.most_common()[:-bottom_1_percent-1:-1]]
-    return stopwords
-
-# 불용어 제거된 명사 추출 함수
-def filter_nouns(nouns, stopwords):
-    return ' '.join([noun for noun in nouns.split() if noun not in stopwords])
+# 형태소 분석기 초기화 (서버 시작 시 JVM 을 미리 띄움)
+warm_up()
+
+# 업로드 파일 저장 경로와 보관 시간(초): 결과 페이지/다운로드를 다시 요청할 때 같은 파일을 사용
+UPLOAD_DIR = './uploads'
+UPLOAD_TTL = 24 * 3600
+
+# 백그라운드 작업 결과 파일 보관 시간(초): 지나면 삭제하고 작업을 'expired' 로 표시
+RESULT_TTL = 7 * 24 * 3600
+
+# 업로드를 나눠 읽는 행 수, HTML 결과 한 페이지의 행 수
+CHUNK_ROWS = 200
+PAGE_SIZE = 50
+
+# 프로세스 안에 기억해 둘 업로드별 불용어 set 개수
+UPLOAD_STOPWORDS_CACHE = 32
+
+# 결과 출력 형식: HTML(페이지 단위), NDJSON / CSV (전체를 조각 단위로 스트리밍)
+OUTPUT_FORMATS = ('html', 'ndjson', 'csv')
+
+# 분석 종류 (업로드 분석 / 백그라운드 작업 공통)
+ACTIONS = ('extract-nouns', 'generate-stopwords')
+
+# 백그라운드 작업 큐 (서버 시작 시 생성: 워커 프로세스가 이 모듈을 다시 불러올 때 큐를 또 만들지 않도록)
+job_queue = None
+
+# 오래된 업로드 파일 삭제 (업로드 id 로 시작하는 파일만: 작업 DB 는 유지)
+# 대기/실행 중인 작업의 파일은 남기고, 작업 결과 파일은 RESULT_TTL 이 지나면 삭제 후 작업을 만료로 표시
+def cleanup_uploads():
+    now = time.time()
+    unfinished = {job_id for job_id, action, owner in job_queue.store.unfinished()} if job_queue is not None else set()
+    for file_name in os.listdir(UPLOAD_DIR):
+        match = re.fullmatch(r'([0-9a-f]{32})(\.result)?\.csv(\.part)?', file_name)
+        if match is None or match.group(1) in unfinished:
+            continue
+        path = os.path.join(UPLOAD_DIR, file_name)
+        is_result = match.group(2) is not None and match.group(3) is None
+        if now - os.path.getmtime(path) <= (RESULT_TTL if is_result else UPLOAD_TTL):
+            continue
+        os.remove(path)
+        if is_result and job_queue is not None:
+            job_queue.store.expire(match.group(1))
+
+# 업로드 파일 경로 (업로드 id 는 uuid hex 만 허용)
+def upload_path(upload_id, suffix='.csv'):
+    if not re.fullmatch(r'[0-9a-f]{32}', upload_id):
+        raise HTTPException(status_code=404, detail="업로드를 찾을 수 없습니다.")
+    return os.path.join(UPLOAD_DIR, upload_id + suffix)
+
+# 업로드를 메모리에 올리지 않고 디스크로 조각 단위 복사 → 업로드 id
+def save_upload(file):
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    cleanup_uploads()
+    upload_id = uuid.uuid4().hex
+    with open(upload_path(upload_id), 'wb') as upload_file:
+        shutil.copyfileobj(file.file, upload_file, 1024 * 1024)
+    return upload_id
+
+# 저장된 업로드를 CHUNK_ROWS 행씩 읽기
+def read_chunks(upload_id):
+    path = upload_path(upload_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="업로드를 찾을 수 없습니다.")
+    return pd.read_csv(path, chunksize=CHUNK_ROWS, encoding='utf-8')
+
+# 업로드 전체의 불용어 set (첫 요청 때 nouns 컬럼을 한 번 훑어 계산하고 저장, 다음 페이지와 같은 파일 재업로드 시 재사용)
+# 같은 업로드의 페이지/조각마다 파일을 다시 해시하지 않도록 프로세스 안에서도 기억
+_upload_stopwords = {}
+
+def upload_stopwords(upload_id):
+    if upload_id not in _upload_stopwords:
+        path = upload_path(upload_id)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="업로드를 찾을 수 없습니다.")
+        if len(_upload_stopwords) >= UPLOAD_STOPWORDS_CACHE:
+            _upload_stopwords.pop(next(iter(_upload_stopwords)))
+        _upload_stopwords[upload_id] = frozenset(file_stopwords(path, CHUNK_ROWS))
+    return _upload_stopwords[upload_id]
+
+# 업로드의 데이터 조각 하나 분석 ('generate-stopwords' 는 업로드 전체 불용어 사용)
+def analyze_upload_frame(data, action, upload_id):
+    stopwords = upload_stopwords(upload_id) if action == 'generate-stopwords' else None
+    return analyze_frame(data, action, stopwords)
+
+# 분석 결과를 NDJSON / CSV 조각으로 스트리밍 (메모리에는 CHUNK_ROWS 행만 올라감)
+def stream_results(upload_id, action, output_format):
+    for number, chunk in enumerate(read_chunks(upload_id)):
+        data = analyze_upload_frame(chunk, action, upload_id)
+        if output_format == 'ndjson':
+            yield data.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n'
+        else:
+            yield data.to_csv(index=False, header=number == 0)
+
+# HTML 결과 한 페이지: 해당 페이지의 행만 읽어서 분석 (다음 페이지 유무 확인용으로 한 행 더 읽음)
+def read_page(upload_id, action, page, page_size=PAGE_SIZE):
+    start = (page - 1) * page_size
+    seen = 0
+    rows = []
+    for chunk in read_chunks(upload_id):
+        if seen + len(chunk) > start:
+            rows.append(chunk.iloc[max(0, start - seen):])
+        seen += len(chunk)
+        if sum(len(frame) for frame in rows) > page_size:
+            break
+    if not rows:
+        return pd.DataFrame(), False
+    data = pd.concat(rows)
+    return analyze_upload_frame(data.iloc[:page_size].copy(), action, upload_id), len(data) > page_size
+
+# 결과 응답: HTML 은 페이지 단위 표, NDJSON / CSV 는 스트리밍
+async def analysis_response(request, upload_id, action, output_format, page):
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"형식은 {', '.join(OUTPUT_FORMATS)} 중 하나로 입력하세요.")
+    if output_format == 'ndjson':
+        return StreamingResponse(stream_results(upload_id, action, output_format), media_type='application/x-ndjson')
+    if output_format == 'csv':
+        return StreamingResponse(
+            stream_results(upload_id, action, output_format), media_type='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{action}-{upload_id}.csv"'},
+        )
+
+    data, has_next = await run_in_threadpool(read_page, upload_id, action, page)
+    base_url = f"/results/{upload_id}/{action}"
+    return templates.TemplateResponse("result.html", {
+        "request": request,
+        "result": data.to_html(),
+        "page": page,
+        "prev_url": f"{base_url}?page={page - 1}" if page > 1 else None,
+        "next_url": f"{base_url}?page={page + 1}" if has_next else None,
+        "download_url": f"{base_url}?format=csv",
+    })
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/extract-nouns/")
-async def extract_nouns_endpoint(request: Request, file: UploadFile = File(...)):
-    content = await file.read()
-    data = pd.read_csv(StringIO(content.decode('utf-8')))
-    data['nouns'] = data['Content'].apply(extract_nouns)
-    
-    result_html = data.to_html()
-    return templates.TemplateResponse("result.html", {"request": request, "result": result_html})
+async def extract_nouns_endpoint(request: Request, file: UploadFile = File(...), format: str = Form('html')):
+    upload_id = await run_in_threadpool(save_upload, file)
+    return await analysis_response(request, upload_id, 'extract-nouns', format, 1)
 
 @app.post("/generate-stopwords/")
-async def generate_stopwords_endpoint(request: Request, file: UploadFile = File(...)):
-    content = await file.read()
-    data = pd.read_csv(StringIO(content.decode('utf-8')))
-    
-    all_nouns = ' '.join(data['nouns'])
-    stopwords = generate_stopwords(all_nouns)
-    data['filtered_nouns'] = data['nouns'].apply(lambda x: filter_nouns(x, stopwords))
-    
-    result_html = data.to_html()
-    return templates.TemplateResponse("result.html", {"request": request, "result": result_html})
+async def generate_stopwords_endpoint(request: Request, file: UploadFile = File(...), format: str = Form('html')):
+    upload_id = await run_in_threadpool(save_upload, file)
+    return await analysis_response(request, upload_id, 'generate-stopwords', format, 1)
+
+# 저장된 업로드의 다른 페이지 / 전체 결과 다운로드
+@app.get("/results/{upload_id}/{action}")
+async def results_endpoint(request: Request, upload_id: str, action: str, page: int = 1, format: str = 'html'):
+    if action not in ACTIONS or page < 1:
+        raise HTTPException(status_code=404, detail="결과를 찾을 수 없습니다.")
+    return await analysis_response(request, upload_id, action, format, page)
+
+# 서버 시작 시 작업 큐 생성, 서버가 중간에 종료되어 끝나지 않은 작업은 다시 실행
+@app.on_event("startup")
+def start_job_queue():
+    global job_queue
+    job_queue = JobQueue()
+    job_queue.resume(lambda job_id: (upload_path(job_id), upload_path(job_id, '.result.csv')))
+
+@app.on_event("shutdown")
+def stop_job_queue():
+    if job_queue is not None:
+        job_queue.shutdown()
+
+# 큰 업로드를 백그라운드 작업으로 분석: 업로드 id 를 작업 id 로 바로 반환
+@app.post("/jobs")
+async def submit_job_endpoint(file: UploadFile = File(...), action: str = Form(...)):
+    if action not in ACTIONS:
+        raise HTTPException(status_code=400, detail=f"작업 종류는 {', '.join(ACTIONS)} 중 하나로 입력하세요.")
+    job_id = await run_in_threadpool(save_upload, file)
+    await run_in_threadpool(job_queue.submit, job_id, action, upload_path(job_id), upload_path(job_id, '.result.csv'))
+    return {"job_id": job_id}
+
+# 작업 상태: 처리한 행 수, 초당 처리 행 수
+@app.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    upload_path(job_id)
+    job = await run_in_threadpool(job_queue.status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return {
+        "job_id": job_id,
+        "action": job['action'],
+        "status": job['status'],
+        "rows_processed": job['rows_done'],
+        "rows_per_sec": job.get('rows_per_sec', 0.0),
+        "elapsed": job.get('elapsed', 0.0),
+        "error": job['error'],
+        "result_url": f"/jobs/{job_id}/result" if job['status'] == 'done' else None,
+    }
+
+# 완료된 작업의 결과 CSV 다운로드
+@app.get("/jobs/{job_id}/result")
+async def job_result_endpoint(job_id: str):
+    path = upload_path(job_id, '.result.csv')
+    job = await run_in_threadpool(job_queue.status, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    if job['status'] == 'expired':
+        raise HTTPException(status_code=410, detail="작업 결과 보관 기간이 지나 삭제되었습니다.")
+    if job['status'] != 'done' or not os.path.exists(path):
+        raise HTTPException(status_code=409, detail=f"작업이 아직 완료되지 않았습니다. (상태: {job['status']})")
+    return FileResponse(path, media_type='text/csv', filename=f"{job['action']}-{job_id}.csv")
 
 # FastAPI 서버 실행
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+# noun_frequency.py
+# 블로그 본문 → 매장별 명사 빈도 전처리 ((본)분석기ver2.ipynb 의 빈도 계산을 대용량용으로 옮긴 명령)
+# 실행: python noun_frequency.py [입력 CSV] [출력 .npz] --workers 8 --csv ./data/스타벅스매장별키워드빈도.csv
+
+import argparse
+import os
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from konlpy.tag import Mecab
+
+# MeCab 사전 경로
+MECAB_DICPATH = '/opt/homebrew/lib/mecab/dic/mecab-ko-dic'
+
+# 입력/출력 기본 경로
+INPUT_FILE = './data/스타벅스블로그본문.csv'
+OUTPUT_FILE = './data/스타벅스매장별키워드빈도.npz'
+
+# 한 번에 읽어 워커에 넘길 행 수, 워커 수, 워커당 동시에 대기시킬 묶음 수 (메모리 상한)
+CHUNK_SIZE = 500
+WORKERS = os.cpu_count()
+PENDING_PER_WORKER = 2
+
+# 불용어 리스트 (본문에서 문자열로 제거)
+stopwords = ['스타벅스', '스타', '벅스', '스벅', '매장', '카페']
+
+# 불용어를 한 번에 지우는 정규식 (긴 단어 우선: '스타벅스' 를 '스타' 보다 먼저)
+stopword_pattern = re.compile('|'.join(re.escape(word) for word in sorted(stopwords, key=len, reverse=True)))
+
+# 워커 프로세스마다 하나씩 만드는 형태소 분석기
+_mecab = None
+
+
+def _init_worker(dicpath):
+    global _mecab
+    _mecab = Mecab(dicpath=dicpath)
+
+
+# 불용어 제거 함수 (본문을 한 번만 훑음)
+def remove_stopwords(text):
+    if not isinstance(text, str):  # NaN 값 처리
+        return ''
+    return stopword_pattern.sub('', text)
+
+
+# 워커: 본문 묶음의 매장별 명사 Counter
+def count_chunk(store_names, contents):
+    counts = {}
+    for store_name, content in zip(store_names, contents):
+        counts.setdefault(store_name, Counter()).update(_mecab.nouns(remove_stopwords(content)))
+    return counts
+
+
+# 블로그 CSV 를 CHUNK_SIZE 행씩 읽어 (매장명 리스트, 본문 리스트) 로 반환
+def read_chunks(input_path, chunk_size=CHUNK_SIZE):
+    for chunk in pd.read_csv(input_path, usecols=['Store_Name', 'Content'], chunksize=chunk_size):
+        yield chunk['Store_Name'].tolist(), chunk['Content'].tolist()
+
+
+# 매장별 빈도 집계: 여러 프로세스에서 묶음별 Counter 를 만든 뒤 매장별/전체 Counter 로 병합
+# 대기 중인 묶음 수를 제한하므로 메모리는 말뭉치 크기가 아니라 매장 수 × 어휘 수에 비례
+def count_store_nouns(input_path, workers=WORKERS, chunk_size=CHUNK_SIZE, dicpath=MECAB_DICPATH):
+    store_counts = {}
+    global_counts = Counter()
+    rows = 0
+    start_time = time.time()
+
+    def merge(partial):
+        for store_name, counts in partial.items():
+            store_counts.setdefault(store_name, Counter()).update(counts)
+            global_counts.update(counts)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(dicpath,)) as pool:
+        pending = deque()
+        for store_names, contents in read_chunks(input_path, chunk_size):
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                merge(pending.popleft().result())
+            pending.append(pool.submit(count_chunk, store_names, contents))
+            rows += len(store_names)
+            print(f"명사 추출 진행: {rows}행 ({rows / (time.time() - start_time):.0f}행/초)")
+        while pending:
+            merge(pending.popleft().result())
+
+    return store_counts, global_counts
+
+
+# 1번씩만 나오는 키워드 및 글자 개수가 1개인 단어 제거
+def filter_counts(counts):
+    return {noun: count for noun, count in counts.items() if count > 1 and len(noun) > 1}
+
+
+# 매장별 빈도를 바이너리(.npz)로 저장: 매장명, 어휘, 매장×어휘 CSR 배열(indptr, indices, counts), 전체 빈도
+def save_frequencies(output_path, store_counts, global_counts):
+    store_names = list(store_counts)
+    filtered = [filter_counts(store_counts[store_name]) for store_name in store_names]
+    terms = sorted({noun for counts in filtered for noun in counts})
+    term_index = {term: column for column, term in enumerate(terms)}
+
+    indptr = np.zeros(len(filtered) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(counts) for counts in filtered])
+    indices = np.fromiter((term_index[noun] for counts in filtered for noun in counts), dtype=np.int32, count=indptr[-1])
+    counts = np.fromiter((count for counts in filtered for count in counts.values()), dtype=np.int32, count=indptr[-1])
+
+    global_terms = list(global_counts)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    np.savez_compressed(
+        output_path, store_names=np.array(store_names), terms=np.array(terms), indptr=indptr, indices=indices, counts=counts,
+        global_terms=np.array(global_terms), global_counts=np.array([global_counts[term] for term in global_terms], dtype=np.int64),
+    )
+
+
+# 저장된 바이너리 빈도 불러오기: (매장명 리스트, 매장별 빈도 딕셔너리 리스트, 전체 Counter)
+def load_frequencies(path):
+    arrays = np.load(path)
+    terms = arrays['terms'].tolist()
+    indptr, indices, counts = arrays['indptr'], arrays['indices'], arrays['counts']
+    frequencies = [
+        {terms[column]: int(count) for column, count in zip(indices[start:end], counts[start:end])}
+        for start, end in zip(indptr[:-1], indptr[1:])
+    ]
+    global_counts = Counter(dict(zip(arrays['global_terms'].tolist(), arrays['global_counts'].tolist())))
+    return arrays['store_names'].tolist(), frequencies, global_counts
+
+
+# 기존 노트북 형식의 CSV (Store_Name, frequency) 로도 저장 ((본)모델용파일전처리.ipynb 입력용)
+def save_frequency_csv(csv_path, store_names, frequencies):
+    pd.DataFrame({'Store_Name': store_names, 'frequency': [str(frequency) for frequency in frequencies]}).to_csv(csv_path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="블로그 본문 매장별 명사 빈도 전처리")
+    parser.add_argument('input', nargs='?', default=INPUT_FILE)
+    parser.add_argument('output', nargs='?', default=OUTPUT_FILE)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--csv', help="기존 형식의 CSV 도 함께 저장할 경로")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    store_counts, global_counts = count_store_nouns(args.input, args.workers, args.chunk_size)
+    save_frequencies(args.output, store_counts, global_counts)
+    print(f"매장 {len(store_counts)}개, 전체 명사 {len(global_counts)}개 빈도 저장 완료: {args.output} ({time.time() - start_time:.2f}초)")
+
+    # 상위 1000개 명사 출력
+    print(Counter(filter_counts(global_counts)).most_common(1000))
+
+    if args.csv:
+        save_frequency_csv(args.csv, *load_frequencies(args.output)[:2])
+        print(f"CSV 저장 완료: {args.csv}")
@@ -2,54 +2,440 @@ import pandas as pd
 import numpy as np
 import torch
 from transformers import BertModel, BertTokenizer
-from konlpy.tag import Okt
-import ast
-from sklearn.metrics.pairwise import cosine_similarity
-import hashlib  # 입력 해시 생성용
 import os
+import sys
 import json
 import time
+import threading
+from vocab_index import build_vocab_index, extend_vocab_index, load_vocab_index, match_vocabulary, normalize_rows
+from term_matrix import SCORING_MODES, score_stores, select_top_k
+from store_catalog import (
+    CATALOG_DIR, SnapshotLock, apply_store_changes, catalog_write_lock, get_catalog, load_saved_catalog,
+    publish_revision, read_revision, replace_catalog, save_catalog,
+)
+from filter_rules import StoreFilter
+from embedding_store import EmbeddingStore
+from result_cache import ResultCache, make_cache_key
+from noun_extractor import extract_nouns_batch, warm_up
+from ann_index import IVFIndex, measure_recall
+from neighbour_table import NeighbourTable, build_neighbour_table
+from embedding_batcher import EmbeddingBatcher
+from batch_scoring import build_match_matrix, rank_queries
+from store_profiles import STORE_PROFILE_FILE, build_store_profiles, load_store_profiles, save_store_profiles, shortlist_stores, measure_shortlist_recall
+
+# KoBERT 모델 이름
+model_name = 'monologg/kobert'
 
-# MPS 장치 사용 여부 확인
-device = torch.device('mps') if torch.backends.mps.is_available() else torch.device('cpu')
-print(f"Using device: {device}")
+# 단어 임베딩 풀링 방식 (영구 임베딩 저장소의 키에 포함)
+# 'masked_mean': 패딩 위치를 제외한 토큰 평균 → 같은 배치에 어떤 단어가 있든 결과가 같음
+POOLING = 'masked_mean'
 
-# KoBERT 모델과 토크나이저 로드 및 초기화
-model_name = 'monologg/kobert'
-tokenizer = BertTokenizer.from_pretrained(model_name)
-model = BertModel.from_pretrained(model_name)
-model.to(device)
-print("KoBERT 모델과 토크나이저 로드 완료")
+# 단어 임베딩 배치 설정: 명사 하나의 최대 토큰 길이, 한 번에 모델에 넣을 단어 수
+EMBEDDING_MAX_LENGTH = 32
+EMBEDDING_BATCH_SIZE = 64
+
+# 동시 요청 임베딩 마이크로 배치 설정: 첫 요청 후 최대 대기 시간(ms), 한 번에 모을 최대 단어 수
+# 이보다 많은 단어를 한 번에 요청하면 (어휘 인덱스 생성 등) 배치 스케줄러를 거치지 않고 바로 계산
+EMBEDDING_MAX_WAIT_MS = 5
+EMBEDDING_MAX_BATCH = EMBEDDING_BATCH_SIZE
 
-# 단어 임베딩을 캐싱하기 위한 딕셔너리
+# 단어 임베딩을 캐싱하기 위한 딕셔너리 (프로세스 내부)
 embedding_cache = {}
 
 # 캐시 디렉토리 설정
 CACHE_DIR = './cache'
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
 
-def get_embeddings_with_cache(words):
-    embeddings = []
-    words_to_process = []
-    for word in words:
-        if word in embedding_cache:
-            embeddings.append(embedding_cache[word])
-        else:
-            words_to_process.append(word)
-    
-    if words_to_process:
-        inputs = tokenizer(words_to_process, return_tensors='pt', padding=True, truncation=True, max_length=512)
+# 추천 결과 캐시 설정 (최대 항목 수, 최대 바이트, 유효 시간(초), 메모리 캐시 항목 수)
+# 최대 항목 수/바이트는 캐시 폴더를 함께 쓰는 워커 프로세스 전체 합계, 폴더를 다시 읽어 맞추는 간격(초)
+RESULT_CACHE_MAX_ENTRIES = 10000
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+RESULT_CACHE_TTL = 7 * 24 * 3600
+RESULT_CACHE_MEMORY_ENTRIES = 1024
+RESULT_CACHE_SCAN_INTERVAL = 60
+
+# 어휘 임베딩 인덱스 경로 (풀링 방식별로 분리)
+VOCAB_INDEX_DIR = os.path.join('./data/vocab', POOLING)
+
+# 원본 데이터 경로
+DATA_FILE = './data/스타벅스추천모델빈도.csv'  # 이 경로를 실제 데이터 파일 경로로 수정하세요.
+
+# 명사 유사도 기준치
+SIMILARITY_THRESHOLD = 0.99
+
+# 출력되는 매장들의 기본 개수와 한 번에 요청할 수 있는 최대 개수 (top_k)
+TOP_N = 10
+
+# 기본 점수 방식: 'raw' (빈도 합), 'relative' (매장 내 상대 빈도), 'tfidf', 'bm25'
+# 블로그 글이 많은 매장의 점수가 과도하게 커지는 문제는 'relative' / 'bm25' 로 완화 (요청마다 선택 가능)
+SCORING_MODE = 'raw'
+MAX_TOP_K = 100
+
+# 명사 매칭 방식: 'ivf' (근사 반경 검색, 가까운 군집만 비교) 또는 'exact' (어휘 전체 전수 비교)
+MATCH_MODE = 'ivf'
+IVF_NPROBE = 8
+IVF_INDEX_FILE = os.path.join(VOCAB_INDEX_DIR, 'ivf_index.npz')
+
+# 매장 프로필 벡터 1단계 후보 선정: 필터링된 매장이 이보다 많으면 프로필 내적 상위 SHORTLIST_SIZE 개만 정확 점수 계산
+# (0 이면 사용하지 않음, 프로필 가중치는 'tfidf' 또는 'frequency')
+SHORTLIST_SIZE = 300
+PROFILE_WEIGHTING = 'tfidf'
+STORE_PROFILE_PATH = os.path.join(CATALOG_DIR, STORE_PROFILE_FILE)
+
+# 어휘 단어별 유사 단어 이웃 목록 (오프라인 생성: --build-neighbours)
+NEIGHBOUR_TABLE_FILE = os.path.join(VOCAB_INDEX_DIR, 'neighbours.npz')
+
+# 매장 어휘 임베딩 행렬(L2 정규화)과 단어→행 번호 인덱스
+vocab_matrix = None
+vocab_word_index = None
+
+# 어휘 임베딩 근사 최근접 이웃(IVF) 색인
+vocab_ann = None
+
+# 어휘 단어 → 유사 단어 이웃 목록 표 (없으면 벡터 검색으로 대체)
+neighbour_table = None
+
+# 현재 사용 중인 매장 카탈로그와, 카탈로그 단어(열) 순서 → 어휘 인덱스 행 번호 매핑
+active_catalog = None
+catalog_vocab_rows = None
+
+# 현재 카탈로그에 맞춰 컴파일된 필터링 규칙
+store_filter = None
+
+# 현재 카탈로그의 매장 프로필 벡터 (매장 수 × 임베딩 차원)
+store_profiles = None
+
+# 현재 스냅샷이 반영한 저장본 변경 번호 (다른 워커 프로세스가 증분 업데이트를 저장하면 바뀜)
+active_revision = None
+
+# 증분 업데이트 잠금: 업데이트는 한 번에 하나씩, 위 전역 상태(스냅샷) 교체는 진행 중인 추천 계산이 끝난 뒤에
+# (프로세스 사이에서는 catalog_write_lock 으로 한 번에 하나씩)
+catalog_update_lock = threading.Lock()
+snapshot_lock = SnapshotLock()
+
+# init() 에서 준비하는 모델/저장소/캐시/스케줄러 (모듈을 불러오기만 해서는 만들지 않음)
+# 배치 점수 계산의 spawn 워커 프로세스는 이 스크립트를 __mp_main__ 으로 다시 실행하므로,
+# 무거운 준비를 모듈 최상단에 두면 워커마다 KoBERT/JVM 을 띄우고 캐시 디렉토리를 정리하게 됨
+device = None
+tokenizer = None
+model = None
+embedding_store = None  # 재시작과 여러 워커 프로세스 사이에 공유되는 디스크 임베딩 저장소 (memmap)
+result_cache = None
+embedding_batcher = None  # 동시에 들어온 요청들의 새 단어를 모아 한 번의 모델 호출로 계산하는 스케줄러
+
+# 추천에 필요한 모델, 형태소 분석기, 임베딩 저장소, 결과 캐시, 임베딩 스케줄러 준비 (여러 번 호출해도 1회만)
+def init():
+    global device, tokenizer, model, embedding_store, result_cache, embedding_batcher
+    if model is not None:
+        return
+
+    # MPS 장치 사용 여부 확인
+    device = torch.device('mps') if torch.backends.mps.is_available() else torch.device('cpu')
+    print(f"Using device: {device}")
+
+    # KoBERT 모델과 토크나이저 로드 및 초기화
+    tokenizer = BertTokenizer.from_pretrained(model_name)
+    model = BertModel.from_pretrained(model_name)
+    model.to(device)
+    print("KoBERT 모델과 토크나이저 로드 완료")
+
+    # 형태소 분석기(JVM) 미리 시작
+    warm_up()
+    print("형태소 분석기 준비 완료")
+
+    embedding_store = EmbeddingStore(model_name, POOLING)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    result_cache = ResultCache(
+        CACHE_DIR, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES,
+        ttl=RESULT_CACHE_TTL, memory_entries=RESULT_CACHE_MEMORY_ENTRIES, scan_interval=RESULT_CACHE_SCAN_INTERVAL,
+    )
+    embedding_batcher = EmbeddingBatcher(
+        compute_and_store_embeddings, max_batch_size=EMBEDDING_MAX_BATCH, max_wait=EMBEDDING_MAX_WAIT_MS / 1000,
+    )
+
+# 모델로 단어 임베딩 계산 함수
+# 토큰 길이가 비슷한 단어끼리 정렬해 배치를 나누고(패딩 최소화), 어텐션 마스크로 패딩을 제외하고 평균
+# 반환 순서는 입력 단어 순서와 같음
+def compute_embeddings(words, batch_size=EMBEDDING_BATCH_SIZE):
+    lengths = [len(ids) for ids in tokenizer(words, truncation=True, max_length=EMBEDDING_MAX_LENGTH)['input_ids']]
+    order = sorted(range(len(words)), key=lambda position: lengths[position])
+
+    embeddings = [None] * len(words)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        inputs = tokenizer(
+            [words[position] for position in batch], return_tensors='pt',
+            padding=True, truncation=True, max_length=EMBEDDING_MAX_LENGTH,
+        )
         inputs = {key: value.to(device) for key, value in inputs.items()}
         with torch.no_grad():
             outputs = model(**inputs)
-        new_embeddings = outputs.last_hidden_state.mean(dim=1).cpu().numpy()
-        for word, embedding in zip(words_to_process, new_embeddings):
-            embedding_cache[word] = embedding
-            embeddings.append(embedding)
-    
+        mask = inputs['attention_mask'].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+        pooled = (outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        for position, embedding in zip(batch, pooled.cpu().numpy()):
+            embeddings[position] = embedding
     return np.array(embeddings)
 
+# 단어 임베딩 함수: 프로세스 캐시 → 디스크 저장소 → 모델 순으로 찾고, 새로 계산한 벡터는 저장소에 추가
+# 반환 순서는 입력 단어 순서와 같음
+def get_embeddings_with_cache(words):
+    missing = [word for word in words if word not in embedding_cache]
+    if missing:
+        embedding_cache.update(embedding_store.get_many(missing))
+
+    words_to_process = list(dict.fromkeys(word for word in words if word not in embedding_cache))
+    if len(words_to_process) >= EMBEDDING_MAX_BATCH:
+        compute_and_store_embeddings(words_to_process)
+    elif words_to_process:
+        embedding_batcher.embed(words_to_process)
+
+    return np.array([embedding_cache[word] for word in words])
+
+# 새 단어 임베딩 계산 후 프로세스 캐시와 디스크 저장소에 추가
+# 마이크로 배치 스케줄러가 여러 요청에서 모은 고유 단어로 호출함
+def compute_and_store_embeddings(words):
+    new_embeddings = compute_embeddings(words)
+    for word, embedding in zip(words, new_embeddings):
+        embedding_cache[word] = embedding
+    embedding_store.append(words, new_embeddings)
+    return new_embeddings
+
+# 어휘 단어 임베딩 함수: 디스크 저장소 → 모델 순으로 찾고 새로 계산한 벡터는 저장소에 추가
+# 어휘 행렬에 그대로 들어가므로 프로세스 캐시(embedding_cache)에는 넣지 않음 (같은 벡터를 메모리에 두 번 두지 않도록)
+def embed_vocabulary(words):
+    embeddings = embedding_store.get_many(words)
+    missing = list(dict.fromkeys(word for word in words if word not in embeddings))
+    if missing:
+        new_embeddings = compute_embeddings(missing)
+        embedding_store.append(missing, new_embeddings)
+        embeddings.update(zip(missing, new_embeddings))
+    return np.array([embeddings[word] for word in words])
+
+# 매장 어휘 임베딩 인덱스 준비 함수
+# 저장된 인덱스가 카탈로그의 단어를 모두 포함하면 그대로 사용하고, 아니면 새로 생성
+# 반환: (어휘 행렬, 단어→행 번호, IVF 색인, 이웃 목록 표) - 전역 상태는 바꾸지 않음 (교체는 호출하는 쪽에서)
+def prepare_vocab_index(words, rebuild=False):
+    loaded = None if rebuild else load_vocab_index(VOCAB_INDEX_DIR)
+    if loaded is not None and all(word in loaded[1] for word in words):
+        matrix, word_index = loaded
+        ann = IVFIndex.load(IVF_INDEX_FILE, matrix) if os.path.exists(IVF_INDEX_FILE) else None
+        table = load_neighbour_table(len(matrix))
+    else:
+        print(f"매장 어휘 {len(words)}개 임베딩 인덱스 생성 중...")
+        matrix, word_index = build_vocab_index(
+            words, embed_vocabulary, batch_size=EMBEDDING_BATCH_SIZE * 16, vocab_dir=VOCAB_INDEX_DIR,
+        )
+        ann = None
+        table = None
+        if os.path.exists(NEIGHBOUR_TABLE_FILE):
+            os.remove(NEIGHBOUR_TABLE_FILE)  # 어휘가 바뀌었으므로 이웃 목록도 다시 생성해야 함
+
+    if ann is None and len(matrix):
+        print("어휘 IVF 색인 생성 중...")
+        ann = IVFIndex.build(matrix, nprobe=IVF_NPROBE)
+        ann.save(IVF_INDEX_FILE)
+    return matrix, word_index, ann, table
+
+# 저장된 이웃 목록 표 불러오기 (없거나 어휘/기준치가 다르면 None)
+def load_neighbour_table(vocab_size):
+    if not os.path.exists(NEIGHBOUR_TABLE_FILE):
+        return None
+    return NeighbourTable.load(NEIGHBOUR_TABLE_FILE, vocab_size, SIMILARITY_THRESHOLD)
+
+# 오프라인 이웃 목록 생성 함수 (MATCH_MODE 가 'exact' 이면 전수 비교, 아니면 IVF 근사 검색 사용)
+def prepare_neighbour_table():
+    global neighbour_table
+    index = vocab_ann if MATCH_MODE == 'ivf' else None
+    neighbour_table = build_neighbour_table(vocab_matrix, SIMILARITY_THRESHOLD, index)
+    neighbour_table.save(NEIGHBOUR_TABLE_FILE)
+    return neighbour_table
+
+# 벡터 검색: 명사 벡터와 유사도 기준치 이상인 어휘 마스크 (IVF 근사 검색, 'exact' 모드면 전수 비교)
+def search_vocabulary(user_embeddings):
+    if MATCH_MODE == 'ivf' and vocab_ann is not None:
+        return vocab_ann.match(user_embeddings, SIMILARITY_THRESHOLD)
+    return match_vocabulary(user_embeddings, vocab_matrix, SIMILARITY_THRESHOLD)
+
+# 벡터 검색(질의별): 명사 벡터마다 유사도 기준치 이상인 어휘 행 번호 배열
+def search_vocabulary_rows(user_embeddings):
+    if MATCH_MODE == 'ivf' and vocab_ann is not None:
+        return vocab_ann.range_search(user_embeddings, SIMILARITY_THRESHOLD)
+    return [np.flatnonzero(similarities >= SIMILARITY_THRESHOLD) for similarities in user_embeddings @ vocab_matrix.T]
+
+# 명사별 유사 어휘 행 번호 (배치 추천용, 어휘에 없는 명사는 한 번에 임베딩)
+def match_nouns_individually(nouns):
+    neighbours = {}
+    to_search = []
+    for noun in nouns:
+        if neighbour_table is not None and noun in vocab_word_index:
+            neighbours[noun] = neighbour_table.neighbours_of(vocab_word_index[noun])
+        else:
+            to_search.append(noun)
+    if to_search:
+        neighbours.update(zip(to_search, search_vocabulary_rows(embed_user_nouns(to_search))))
+    return neighbours
+
+# 사용자 명사와 유사도 기준치 이상인 어휘 마스크
+# 어휘에 있는 명사는 이웃 목록 표 조회로 확장하고(모델 호출 없음), 어휘에 없는 명사만 임베딩 후 벡터 검색
+def match_user_nouns(nouns):
+    if neighbour_table is None:
+        return search_vocabulary(embed_user_nouns(nouns))
+
+    mask = neighbour_table.mask([vocab_word_index[noun] for noun in nouns if noun in vocab_word_index])
+    unknown = [noun for noun in nouns if noun not in vocab_word_index]
+    if unknown:
+        mask |= search_vocabulary(normalize_rows(get_embeddings_with_cache(unknown)))
+    return mask
+
+# 매장 카탈로그 로드 함수: 시작 시 1회 파싱, 원본 CSV 가 바뀌거나 다른 워커 프로세스가 증분 업데이트를 저장하면
+# 카탈로그와 어휘 인덱스를 다시 준비
+# 스냅샷을 교체할 수 있으므로 추천 계산(snapshot_lock.reading) 밖에서 호출하고, 안에서는 active_catalog 사용
+def load_store_catalog():
+    if get_catalog(DATA_FILE) is not active_catalog or read_revision() != active_revision:
+        with catalog_update_lock, catalog_write_lock():
+            sync_snapshot()
+    return active_catalog
+
+# 저장본에 맞는 어휘/필터/프로필을 옆에서 만든 뒤 한 번에 교체 (update_stores 와 같은 방식)
+# catalog_update_lock 과 catalog_write_lock 을 잡은 상태에서 호출 (이미 최신이면 그대로 반환)
+def sync_snapshot():
+    global vocab_matrix, vocab_word_index, vocab_ann, neighbour_table
+    global active_catalog, catalog_vocab_rows, store_filter, store_profiles, active_revision
+
+    revision = read_revision()
+    catalog = get_catalog(DATA_FILE)
+    if catalog is active_catalog:
+        if revision == active_revision:
+            return
+        # 다른 워커 프로세스가 저장한 증분 업데이트 (원본 CSV 는 그대로)
+        catalog = load_saved_catalog(DATA_FILE) or catalog
+        replace_catalog(catalog)
+
+    vocabulary = prepare_vocab_index(catalog.terms)
+    vocab_rows = np.array([vocabulary[1][term] for term in catalog.terms], dtype=np.int64)
+    filters = StoreFilter(catalog.stores)
+    profiles = prepare_store_profiles(catalog, vocabulary[0][vocab_rows])
+
+    with snapshot_lock.writing():
+        vocab_matrix, vocab_word_index, vocab_ann, neighbour_table = vocabulary
+        catalog_vocab_rows, store_filter, store_profiles = vocab_rows, filters, profiles
+        active_catalog = catalog
+        active_revision = revision
+
+    # 디스크 캐시는 업데이트한 프로세스가 이미 선택적으로 무효화, 이 프로세스의 메모리에 남은 결과만 비움
+    if result_cache is not None:
+        result_cache.clear_memory()
+
+# 매장 프로필 벡터 준비: 카탈로그 옆에 저장된 프로필이 현재 카탈로그 버전과 같으면 사용, 아니면 생성 후 저장
+# term_vectors: 카탈로그 단어 순서의 정규화된 임베딩
+def prepare_store_profiles(catalog, term_vectors):
+    profiles = load_store_profiles(STORE_PROFILE_PATH, catalog.data_version, PROFILE_WEIGHTING)
+    if profiles is None or len(profiles) != len(catalog.stores):
+        print("매장 프로필 벡터 생성 중...")
+        profiles = build_store_profiles(catalog.term_matrix, term_vectors, PROFILE_WEIGHTING)
+        save_store_profiles(STORE_PROFILE_PATH, profiles, catalog.data_version, PROFILE_WEIGHTING)
+    return profiles
+
+# 새 명사만 임베딩하여 어휘 인덱스, IVF 색인, 이웃 목록을 뒤에 확장 (기존 객체는 그대로 두고 새 객체 반환)
+def extend_vocabulary(new_words):
+    matrix, word_index = extend_vocab_index(
+        vocab_matrix, vocab_word_index, new_words, embed_vocabulary(new_words), VOCAB_INDEX_DIR,
+    )
+    ann = vocab_ann.extended(matrix) if vocab_ann is not None else None
+    if ann is not None:
+        ann.save(IVF_INDEX_FILE)
+
+    table = None
+    if neighbour_table is not None:
+        new_rows = matrix[len(vocab_matrix):]
+        if MATCH_MODE == 'ivf' and ann is not None:
+            found = ann.range_search(new_rows, SIMILARITY_THRESHOLD)
+        else:
+            found = [np.flatnonzero(similarities >= SIMILARITY_THRESHOLD) for similarities in new_rows @ matrix.T]
+        table = neighbour_table.extended(found)
+        table.save(NEIGHBOUR_TABLE_FILE)
+    return matrix, word_index, ann, table
+
+# 캐시된 결과가 매장 변경의 영향을 받는지 판정
+# - tfidf/bm25 점수는 전체 매장 통계(역빈도, 평균 길이)를 쓰므로 항상 영향
+# - tfidf 프로필로 후보를 좁힌 결과(필터 후 매장이 SHORTLIST_SIZE 초과)도 모든 프로필이 바뀌므로 영향
+# - 그 외에는 변경 전/후 스냅샷에서 바뀐 매장 중 하나라도 이 입력의 필터를 통과하고 점수가 0 보다 크면 영향
+# changes: (카탈로그, 어휘 행 매핑, 필터, 바뀐 행 번호) 의 변경 전/후 목록
+def cached_result_affected(tags, changes):
+    if tags['scoring'] in ('tfidf', 'bm25'):
+        return True
+    vocab_mask = match_user_nouns(tags['nouns'])
+    for catalog, vocab_rows, filters, rows in changes:
+        filter_mask = filters.mask(tags['input'])
+        if SHORTLIST_SIZE and PROFILE_WEIGHTING == 'tfidf' and filter_mask.sum() > SHORTLIST_SIZE:
+            return True
+        rows = rows[filter_mask[rows]]
+        if len(rows) and (score_stores(catalog.term_matrix, vocab_mask[vocab_rows], rows) > 0).any():
+            return True
+    return False
+
+# 매장 증분 업데이트 함수 (재시작/전체 재임베딩 없이 실행 중인 색인에 반영)
+# upserts: 추가/수정할 매장 정보 딕셔너리 목록 (Store_Name 필수, 주소/플래그 컬럼, 'frequency': 명사 빈도 딕셔너리)
+# removals: 삭제할 매장 이름 목록
+# 새 스냅샷(카탈로그, 어휘, 필터, 프로필)은 옆에서 만든 뒤 한 번에 교체하고, 영향받는 캐시 결과만 무효화
+def update_stores(upserts=(), removals=()):
+    global vocab_matrix, vocab_word_index, vocab_ann, neighbour_table
+    global active_catalog, catalog_vocab_rows, store_filter, store_profiles, active_revision
+    start_time = time.time()
+
+    # 다른 워커 프로세스의 업데이트와 겹치지 않도록 저장본을 잠근 뒤, 그 사이 저장된 변경부터 반영
+    with catalog_update_lock, catalog_write_lock():
+        sync_snapshot()
+        old_catalog = active_catalog
+        old_vocab_rows, old_filter = catalog_vocab_rows, store_filter
+        catalog, keep_rows, changed_rows, old_rows = apply_store_changes(old_catalog, upserts, removals)
+
+        # 새로 나온 명사만 임베딩 (어휘는 뒤에 추가만 하므로 기존 행 번호와 매핑은 그대로 유효)
+        new_words = [term for term in catalog.terms if term not in vocab_word_index]
+        vocabulary = extend_vocabulary(new_words) if new_words else (vocab_matrix, vocab_word_index, vocab_ann, neighbour_table)
+        vocab_rows = np.array([vocabulary[1][term] for term in catalog.terms], dtype=np.int64)
+
+        # 필터는 바뀐 행만 다시 평가, 프로필과 점수 방식별 행렬은 새 카탈로그 기준으로 다시 계산
+        filters = old_filter.patched(catalog.stores, keep_rows, changed_rows)
+        profiles = build_store_profiles(catalog.term_matrix, vocabulary[0][vocab_rows], PROFILE_WEIGHTING)
+        save_catalog(catalog)
+        save_store_profiles(STORE_PROFILE_PATH, profiles, catalog.data_version, PROFILE_WEIGHTING)
+
+        with snapshot_lock.writing():
+            vocab_matrix, vocab_word_index, vocab_ann, neighbour_table = vocabulary
+            catalog_vocab_rows, store_filter, store_profiles = vocab_rows, filters, profiles
+            active_catalog = catalog
+            replace_catalog(catalog)
+
+        changes = [(old_catalog, old_vocab_rows, old_filter, old_rows), (catalog, vocab_rows, filters, changed_rows)]
+        try:
+            invalidated = result_cache.invalidate_where(lambda tags, results: cached_result_affected(tags, changes))
+        finally:
+            # 무효화가 끝난 뒤(실패해도) 변경 번호 기록: 스냅샷과 저장본은 이미 바뀌었으므로
+            # 다른 워커 프로세스는 다음 요청에서 저장본을 다시 불러오고 메모리 캐시를 비움
+            active_revision = publish_revision()
+
+    print(f"매장 업데이트 완료: 매장 {len(catalog.stores)}개, 새 단어 {len(new_words)}개, "
+          f"무효화된 캐시 {invalidated}개 ({time.time() - start_time:.2f}초)")
+    return {'stores': len(catalog.stores), 'new_terms': len(new_words), 'invalidated': invalidated}
+
+# 입력 명사의 질의 벡터 (고유 명사의 정규화된 벡터 평균, 매장 프로필과 내적)
+# 캐시 키가 명사 집합을 쓰므로 중복 명사는 한 번만 반영 ('커피 커피 라떼' 와 '라떼 커피' 는 같은 후보)
+def query_profile_vector(nouns):
+    return normalize_rows(embed_user_nouns(list(dict.fromkeys(nouns))).mean(axis=0))[0]
+
+# 사용자 명사 임베딩 함수: 어휘에 있는 단어는 인덱스 행을 그대로 쓰고, 없는 단어만 모델로 계산
+def embed_user_nouns(nouns):
+    unknown = [noun for noun in nouns if noun not in vocab_word_index]
+    unknown_embeddings = dict(zip(unknown, get_embeddings_with_cache(unknown))) if unknown else {}
+
+    vectors = []
+    for noun in nouns:
+        if noun in vocab_word_index:
+            vectors.append(vocab_matrix[vocab_word_index[noun]])
+        else:
+            vectors.append(unknown_embeddings[noun])
+    return normalize_rows(vectors)
+
 # 불용어 리스트
 stopwords = ['스타', '벅스', '스타벅스', '스벅', '매장', '카페']
 
@@ -59,522 +445,245 @@ def remove_stopwords(nouns, stopwords):
 
 # 사용자 입력 명사 추출 함수 정의 및 불용어 제거 적용
 def extract_nouns(user_input):
-    okt = Okt()
-    nouns = okt.nouns(user_input)
-    filtered_nouns = remove_stopwords(nouns, stopwords)
-    return filtered_nouns
+    return extract_nouns_many([user_input])[0]
 
-# 빈 데이터 필터링 함수
-def filter_data(data, user_input):
-    filtered_data = data.copy()
-    # 매장 타입 관련 필터링
-    if '리저브' in user_input or 'Reserve' in user_input or 'reserve' in user_input:
-        filtered_data = filtered_data[filtered_data['storeType'] == '리저브']
-    if '일반' in user_input or 'Standard' in user_input or 'standard' in user_input:
-        filtered_data = filtered_data[filtered_data['storeType'] == '일반']
-    if '드라이브 스루' in user_input or '드라이브스루' in user_input or 'drivethrough' in user_input:
-        filtered_data = filtered_data[filtered_data['storeType'] == '드라이브스루']
-
-    # 위치 관련 필터링
-    if '서울시' in user_input or '서울특별시' in user_input or '수도' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('서울특별시')] 
-    if '부산' in user_input or '부산시' in user_input or '부산광역시' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('부산')]
-    if '대구' in user_input or '대구시' in user_input or '대구광역시' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('대구')]
-    if '인천' in user_input or '인천광역시' in user_input or '인천시' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('인천')]
-    if '광주' in user_input or '광주광역시' in user_input or 'gwangju' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('광주광역시')]
-    if '대전' in user_input or '대전시' in user_input or '대전광역시' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('대전')]
-    if '울산' in user_input or '울산시' in user_input or '울산광역시' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('울산')]
-    if '세종' in user_input or '세종특별시' in user_input or 'sejong' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('세종특별자치시')]
-    if '경기' in user_input or '경기도' in user_input or '수도권' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('경기')]
-    if '강원' in user_input or '강원도' in user_input or 'gangwon' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('강원')]
-    if '충북' in user_input or '충청북도' in user_input or 'chungbuk' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('충청북도')]
-    if '충남' in user_input or '충청남도' in user_input or 'chungnam' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('충청남도')]
-    if '전북' in user_input or '전라북도' in user_input or 'jeonbuk' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('전라북도')]
-    if '전남' in user_input or '전라남도' in user_input or 'jeonnam' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('전라남도')]
-    if '경북' in user_input or '경상북도' in user_input or 'gyeongbuk' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('경상북도')]
-    if '경남' in user_input or '경상남도' in user_input or 'gyeongnam' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('경상남도')]
-    if '제주' in user_input or 'Jeju' in user_input or 'jeju' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('제주')]
-    
-    # 대한민국 시 목록으로 필터링
-    
-    # 경기도
-    if '수원시' in user_input or '수원' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('수원시')]
-    if '용인시' in user_input or '용인' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('용인시')]
-    if '고양시' in user_input or '고양' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('고양시')]
-    if '화성시' in user_input or '화성' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('화성시')]
-    if '성남시' in user_input or '성남' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('성남시')]
-    if '부천시' in user_input or '부천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('부천시')]
-    if '남양주시' in user_input or '남양주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('남양주시')]
-    if '안산시' in user_input or '안산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('안산시')]
-    if '평택시' in user_input or '평택' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('평택시')]
-    if '안양시' in user_input or '안양' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('안양시')]
-    if '시흥시' in user_input or '시흥' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('시흥시')]
-    if '파주시' in user_input or '파주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('파주시')]
-    if '김포시' in user_input or '김포' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('김포시')]
-    if '의정부시' in user_input or '의정부' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('의정부시')]
-    if '광주시' in user_input or '경기 광주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('경기도 광주')]
-    if '하남시' in user_input or '하남' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('하남시')]
-    if '광명시' in user_input or '광명' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('광명시')]
-    if '군포시' in user_input or '군포' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('군포시')]
-    if '양주시' in user_input or '양주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('양주시')]
-    if '오산시' in user_input or '오산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('오산시')]
-    if '이천시' in user_input or '이천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('이천시')]
-    if '안성시' in user_input or '안성' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('안성시')]
-    if '구리시' in user_input or '구리' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('구리시')]
-    if '의왕시' in user_input or '의왕' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('의왕시')]
-    if '포천시' in user_input or '포천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('포천시')]
-
-    
-    # 강원특별자치도
-    if '춘천시' in user_input or '춘천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('춘천시')]
-    if '원주시' in user_input or '원주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('원주시')]
-    if '강릉시' in user_input or '강릉' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('강릉시')]
-    if '동해시' in user_input or '동해' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('동해시')]
-    if '속초시' in user_input or '속초' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('속초시')]
-    if '삼척시' in user_input or '삼척' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('삼척시')]
-    
-    # 전라남도
-    if '목포시' in user_input or '목포' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('목포시')]
-    if '여수시' in user_input or '여수' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('여수시')]
-    if '순천시' in user_input or '순천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('순천시')]
-    if '나주시' in user_input or '나주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('나주시')]
-    if '광양시' in user_input or '광양' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('광양시')]
-    # 전라북도
-    if '전주시' in user_input or '전주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('전주시')]
-    if '군산시' in user_input or '군산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('군산시')]
-    if '익산시' in user_input or '익산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('익산시')]
-    if '정읍시' in user_input or '정읍' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('정읍시')]
-    if '남원시' in user_input or '남원' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('남원시')]
-    if '김제시' in user_input or '김제' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('김제시')]
-
-    # 경상북도
-    if '포항시' in user_input or '포항' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('포항시')]
-    if '경주시' in user_input or '경주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('경주시')]
-    if '김천시' in user_input or '김천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('김천시')]
-    if '안동시' in user_input or '안동' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('안동시')]
-    if '구미시' in user_input or '구미' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('구미시')]
-    if '영주시' in user_input or '영주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('영주시')]
-    if '영천시' in user_input or '영천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('영천시')]
-    if '상주시' in user_input or '상주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('상주시')]
-    if '문경시' in user_input or '문경' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('문경시')]
-    if '경산시' in user_input or '경산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('경산시')]
-
-    # 경상남도
-    if '창원시' in user_input or '창원' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('창원시')]
-    if '진주시' in user_input or '진주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('진주시')]
-    if '통영시' in user_input or '통영' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('통영시')]
-    if '사천시' in user_input or '사천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('사천시')]
-    if '김해시' in user_input or '김해' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('김해시')]
-    if '밀양시' in user_input or '밀양' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('밀양시')]
-    if '거제시' in user_input or '거제' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('거제시')]
-    if '양산시' in user_input or '양산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('양산시')]
-
-    # 충청남도 
-    if '천안시' in user_input or '천안' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('천안시')]
-    if '공주시' in user_input or '공주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('공주시')]
-    if '보령시' in user_input or '보령' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('보령시')]
-    if '아산시' in user_input or '아산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('아산시')]
-    if '서산시' in user_input or '서산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('서산시')]
-    if '논산시' in user_input or '논산' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('논산시')]
-    if '계룡시' in user_input or '계룡' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('계룡시')]
-    if '당진시' in user_input or '당진' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('당진시')]
-    
-    # 충청북도
-    if '청주시' in user_input or '청주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('청주시')]
-    if '충주시' in user_input or '충주' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('충주시')]
-    if '제천시' in user_input or '제천' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('제천시')]
-
-    
-    # 서울시 지하철 역 입력시 구로 반환
-    # 강남구
-    if '삼성역' in user_input or '선릉역' in user_input or '역삼역' in user_input or '강남역' in user_input or '압구정역' in user_input or '신사역' in user_input or '매봉역' in user_input or '도곡역' in user_input or '대치역' in user_input or '학여울역' in user_input or '대청역' in user_input or '일원역' in user_input or '수서역' in user_input or '강남구청역' in user_input or '학동역' in user_input or '논현역' in user_input or '신논현역' in user_input or '언주역' in user_input or '선정릉역' in user_input or '삼성중앙역' in user_input or '봉은사역' in user_input or '압구정로데오역' in user_input or '한티역' in user_input or '구릉역' in user_input or '개포동역' in user_input or '대모산역' in user_input or '청담역' in user_input or '강남구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('강남구')]
-
-    # 강동구
-    if '천호역' in user_input or '강동역' in user_input or '길동역' in user_input or '굽은다리역' in user_input or '명일역' in user_input or '고덕역' in user_input or '상일동역' in user_input or '강일역' in user_input or '둔촌동역' in user_input or '암사역' in user_input or '강동구청역' in user_input or '둔촌오륜역' in user_input or '중앙보훈병원역' in user_input or '강동구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('강동구')]
-
-    # 강북구
-    if '미아사거리역' in user_input or '미아역' in user_input or '수유역' in user_input or '솔샘역' in user_input or '삼양사거리역' in user_input or '삼양역' in user_input or '화계역' in user_input or '가오리역' in user_input or '4.19민주묘지역' in user_input or '솔밭공원역' in user_input or '북한산우이역' in user_input or '강북구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('강북구')]
-
-    # 강서구
-    if '까치산역' in user_input or '방화역' in user_input or '개화산역' in user_input or '김포공항역' in user_input or '송정역' in user_input or '마곡역' in user_input or '발산역' in user_input or '우장산역' in user_input or '화곡역' in user_input or '공항시장역' in user_input or '신방화역' in user_input or '마곡나루역' in user_input or '양천향교역' in user_input or '가양역' in user_input or '증미역' in user_input or '등촌역' in user_input or '염창역' in user_input or '강서구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('강서구')]
-
-    # 관악구
-    if '낙성대역' in user_input or '서울대입구역' in user_input or '봉천역' in user_input or '신림역' in user_input or '당곡역' in user_input or '서원역' in user_input or '서울대벤처타운역' in user_input or '관악산역' in user_input or '관악구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('관악구')]
-
-    # 광진구
-    if '건대입구역' in user_input or '구의역' in user_input or '강변역' in user_input or '군자역' in user_input or '아차산역' in user_input or '광나루역' in user_input or '중곡역' in user_input or '어린이대공원역' in user_input or '뚝섬유원지역' in user_input or '광진구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('광진구')]
-    # 구로구
-    if '구로역' in user_input or '구일역' in user_input or '개봉역' in user_input or '오류동역' in user_input or '온수역' in user_input or '신도림역' in user_input or '구로디지털단지역' in user_input or '대림역' in user_input or '도림천역' in user_input or '남구로역' in user_input or '천왕역' in user_input or '구로구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('구로구')]
-
-    # 금천구
-    if '금천구청역' in user_input or '독산역' in user_input or '가산디지털단지역' in user_input or '금천구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('금천구')]
-    
-    # 노원구
-    if '석계역' in user_input or '광운대역' in user_input or '월계역' in user_input or '노원역' in user_input or '상계역' in user_input or '당고개역' in user_input or '화랑대역' in user_input or '태릉입구역' in user_input or '수락산역' in user_input or '마들역' in user_input or '중계역' in user_input or '하계역' in user_input or '공릉역' in user_input or '노원구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('노원구')]
-
-    # 도봉구
-    if '녹천역' in user_input or '창동역' in user_input or '방학역' in user_input or '도봉역' in user_input or '도봉산역' in user_input or '쌍문역' in user_input or '도봉구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('도봉구')]
-
-    # 동대문구
-    if '신설동역' in user_input or '제기동역' in user_input or '청량리역' in user_input or '회기역' in user_input or '외대앞역' in user_input or '신이문역' in user_input or '용두역' in user_input or '답십리역' in user_input or '장한평역' in user_input or '동대문구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('동대문구')]
-    
-    # 동작구
-    if '노량진역' in user_input or '사당역' in user_input or '신대방역' in user_input or '이수역' in user_input or '총신대입구역' in user_input or '동작역' in user_input or '남성역' in user_input or '숭실대입구역' in user_input or '상도역' in user_input or '장승배기역' in user_input or '신대방삼거리역' in user_input or '노들역' in user_input or '흑석역' in user_input or '보라매공원역' in user_input or '보라매병원역' in user_input or '동작구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('동작구')]
-
-    # 마포구
-    if '합정역' in user_input or '홍대입구역' in user_input or '신촌역' in user_input or '이대역' in user_input or '아현역' in user_input or '마포역' in user_input or '공덕역' in user_input or '애오개역' in user_input or '대흥역' in user_input or '광흥창역' in user_input or '상수역' in user_input or '망원역' in user_input or '마포구청역' in user_input or '월드컵경기장역' in user_input or '디지털미디어시티역' in user_input or '서강대역' in user_input or '마포구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('마포구')]
-
-    # 서대문구
-    if '충정로역' in user_input or '홍제역' in user_input or '무악재역' in user_input or '서대문역' in user_input or '가좌역' in user_input or '서대문구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('서대문구')]
-
-
-    # 서초구
-    if '교대역' in user_input or '서초역' in user_input or '방배역' in user_input or '잠원역' in user_input or '고속터미널역' in user_input or '남부터미널역' in user_input or '양재역' in user_input or '남태령역' in user_input or '반포역' in user_input or '내방역' in user_input or '구반포역' in user_input or '신반포역' in user_input or '사평역' in user_input or '양재시민의숲역' in user_input or '청계산입구역' in user_input or '서초구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('서초구')]
-
-
-    # 성동구
-    if '상왕십리역' in user_input or '왕십리역' in user_input or '한양대역' in user_input or '뚝섬역' in user_input or '성수역' in user_input or '용답역' in user_input or '신답역' in user_input or '금호역' in user_input or '옥수역' in user_input or '신금호역' in user_input or '행당역' in user_input or '마장역' in user_input or '응봉역' in user_input or '서울숲역' in user_input or '성동구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('성동구')]
-
-
-    # 성북구
-    if '한성대입구역' in user_input or '성신여대입구역' in user_input or '길음역' in user_input or '돌곶이역' in user_input or '상월곡역' in user_input or '월곡역' in user_input or '고려대역' in user_input or '안암역' in user_input or '보문역' in user_input or '북한산보국문역' in user_input or '정릉역' in user_input or '성북구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('성북구')]
-
-
-    # 송파구
-    if '잠실나루역' in user_input or '잠실역' in user_input or '잠실새내역' in user_input or '종합운동장역' in user_input or '가락시장역' in user_input or '경찰병원역' in user_input or '오금역' in user_input or '올림픽공원역' in user_input or '방이역' in user_input or '개롱역' in user_input or '거여역' in user_input or '마천역' in user_input or '몽촌토성역' in user_input or '석촌역' in user_input or '송파역' in user_input or '문정역' in user_input or '장지역' in user_input or '복정역' in user_input or '삼전역' in user_input or '석촌고분역' in user_input or '송파나루역' in user_input or '한성백제역' in user_input or '송파구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('송파구')]
-
-    # 양천구
-    if '양천구청역' in user_input or '신정네거리역' in user_input or '신정역' in user_input or '목동역' in user_input or '오목교역' in user_input or '신목동역' in user_input or '양천구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('양천구')]
-
-    # 영등포구
-    if '영등포역' in user_input or '신길역' in user_input or '대방역' in user_input or '문래역' in user_input or '영등포구청역' in user_input or '당산역' in user_input or '양평역' in user_input or '영등포시장역' in user_input or '여의도역' in user_input or '여의나루역' in user_input or '보라매역' in user_input or '신풍역' in user_input or '선유도역' in user_input or '국회의사당역' in user_input or '샛강역' in user_input or '서울지방병무청역' in user_input or '영등포구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('영등포구')]
-
-
-    # 용산구
-    if '용산역' in user_input or '남영역' in user_input or '서울역' in user_input or '이촌역' in user_input or '신용산역' in user_input or '삼각지역' in user_input or '숙대입구역' in user_input or '한강진역' in user_input or '이태원f역' in user_input or '녹사평역' in user_input or '효창공원앞역' in user_input or '서빙고역' in user_input or '한남역' in user_input or '용산구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('용산구')]
-
-    # 은평구
-    if '구파발역' in user_input or '연신내역' in user_input or '불광역' in user_input or '녹번역' in user_input or '디지털미디어시티역' in user_input or '증산역' in user_input or '새절역' in user_input or '응암역' in user_input or '구산역' in user_input or '독바위역' in user_input or '역촌역' in user_input or '응암역' in user_input or '수색역' in user_input or '은평구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('은평구')]
-
-
-    # 종로구
-    if '종각역' in user_input or '종로3가역' in user_input or '종로5가역' in user_input or '동대문역' in user_input or '동묘앞역' in user_input or '독립문역' in user_input or '경복궁역' in user_input or '안국역' in user_input or '혜화역' in user_input or '광화문역' in user_input or '창신역' in user_input or '종로구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('종로구')]
-
-
-    # 중구
-    if '서울역' in user_input or '시청역' in user_input or '을지로입구역' in user_input or '을지로3가역' in user_input or '을지로4가역' in user_input or '동대문역사문화공원역' in user_input or '신당역' in user_input or '충무로역' in user_input or '동대입구역' in user_input or '약수역' in user_input or '회현역' in user_input or '명동역' in user_input or '청구역' in user_input or '버티고개역' in user_input or '중구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('중구')]
-
-    # 중랑구
-    if '신내역' in user_input or '봉화산역' in user_input or '먹골역' in user_input or '중화역' in user_input or '상봉역' in user_input or '면목역' in user_input or '사가정역' in user_input or '용마산역' in user_input or '중랑역' in user_input or '망우역' in user_input or '양원역' in user_input or '중랑구' in user_input:
-        filtered_data = filtered_data[filtered_data['storeAddress'].str.contains('중랑구')]
-
-
-
-    # 시설 관련 필터링
-    if '주차공간 있는' in user_input or '주차가능' in user_input or '주차' in user_input or '주차 가능' in user_input:
-        filtered_data = filtered_data[filtered_data['parking'] == True]
-    if '주차공간이없는' in user_input or '주차가불가' in user_input or '차대는곳 없는' in user_input or '주차 불가능' in user_input:
-        filtered_data = filtered_data[filtered_data['parking'] == False]
-    if '주차불가능' in user_input or '주차가 불가' in user_input or '주차못' in user_input or '주차 못' in user_input:
-        filtered_data = filtered_data[filtered_data['parking'] == False]
-
-    if '블론드' in user_input or '블론드 라떼' in user_input or '블론드 에스프레소' in user_input or '블론드 원두' in user_input:
-        filtered_data = filtered_data[filtered_data['blonde'] == True]
-    if '블론드 아닌' in user_input or '블론드 제외' in user_input or '블론드 제외한' in user_input or '블론드 없는' in user_input:
-        filtered_data = filtered_data[filtered_data['blonde'] == False]
-
-    if '피지오' in user_input or '피지오 드링크' in user_input or '피지오 음료' in user_input or '피지오 커피' in user_input:
-        filtered_data = filtered_data[filtered_data['physio'] == True]
-    if '피지오 아닌' in user_input or '피지오 제외' in user_input or '피지오 제외한' in user_input or '피지오 없는' in user_input:
-        filtered_data = filtered_data[filtered_data['physio'] == False]
-
-    if '콜드브루' in user_input or '콜드 브루' in user_input or '콜드브루 커피' in user_input or '콜드 브루 커피' in user_input:
-        filtered_data = filtered_data[filtered_data['coldbrew'] == True]
-    if '콜드브루 아닌' in user_input or '콜드브루 제외' in user_input or '콜드브루 제외한' in user_input or '콜드브루 없는' in user_input:
-        filtered_data = filtered_data[filtered_data['coldbrew'] == False]
-
-    if '현금불가' in user_input or '현금 불가' in user_input or '현금 사용 불가' in user_input or '현금 받지 않는' in user_input:
-        filtered_data = filtered_data[filtered_data['noCash'] == True]
-    if '현금가능' in user_input or '현금 가능' in user_input or '현금 사용 가능' in user_input or '현금 받는' in user_input:
-        filtered_data = filtered_data[filtered_data['noCash'] == False]
-
-    if '외화결제' in user_input or '외화 결제' in user_input or '외국 화폐 결제' in user_input or '외화 사용 가능' in user_input:
-        filtered_data = filtered_data[filtered_data['foreignCash'] == True]
-    if '외화결제 불가' in user_input or '외화 결제 불가' in user_input or '외국 화폐 사용 불가' in user_input or '외화 사용 불가능' in user_input:
-        filtered_data = filtered_data[filtered_data['foreignCash'] == False]
-
-    if '딜리버스' in user_input or '딜리버리' in user_input or '배달 가능한' in user_input or '배달 되는' in user_input:
-        filtered_data = filtered_data[filtered_data['deliBus'] == True]
-    if '딜리버스 아닌' in user_input or '딜리버리 불가' in user_input or '배달 불가' in user_input or '배달 안되는' in user_input:
-        filtered_data = filtered_data[filtered_data['deliBus'] == False]
+# 여러 입력의 명사를 한 번에 추출 (공유 형태소 분석기 사용, 같은 입력은 재분석하지 않음)
+def extract_nouns_many(user_inputs):
+    return [remove_stopwords(nouns, stopwords) for nouns in extract_nouns_batch(user_inputs)]
 
-    if '친환경'in user_input or 'in코'in user_input or '환경 친화적'in user_input or '환경 보호'in user_input:
-        filtered_data = filtered_data[filtered_data['eco'] == True]
-    if '친환경 아닌'in user_input or 'in코 아닌'in user_input or '환경 친화적 아닌'in user_input or '환경 보호 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['eco'] == False]
-
-    if '오후9시이후영업'in user_input or '야간영업'in user_input or '밤에 여는'in user_input or '밤늦게 여는'in user_input:
-        filtered_data = filtered_data[filtered_data['close21'] == True]
-    if '오후9시이후영업 아닌'in user_input or '야간영업 불가'in user_input or '밤에 닫는'in user_input or '일찍 닫는'in user_input:
-        filtered_data = filtered_data[filtered_data['close21'] == False]
-
-    if '펫존'in user_input or '반려동물 존'in user_input or '애완동물 존'in user_input or '반려동물 공간'in user_input:
-        filtered_data = filtered_data[filtered_data['petZone'] == True]
-    if '펫존 아닌'in user_input or '반려동물 존 아닌'in user_input or '애완동물 존 아닌'in user_input or '반려동물 공간 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['petZone'] == False]
+# 데이터 필터링 함수: 입력에 포함된 키워드 규칙들의 매장 마스크를 AND 하여 선택
+# (규칙 테이블은 filter_rules.py, data 는 현재 카탈로그의 매장 데이터)
+def filter_data(data, user_input):
+    return data[store_filter.mask(user_input)]
 
-    if '공항'in user_input or '공항 근처'in user_input or '공항 근방'in user_input or '공항 주변'in user_input:
-        filtered_data = filtered_data[filtered_data['airport'] == True]
-    if '공항 아닌'in user_input or '공항 근처 아닌'in user_input or '공항 근방 아닌'in user_input or '공항 주변 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['airport'] == False]
+# 입력의 정규형: 불용어 제거 후 명사 집합(정렬) + 해석된 필터 조건 집합
+# 어순만 다른 입력(예: '주차 가능한 조용한 매장' / '조용한 주차 가능 매장')은 같은 정규형이 됨
+def canonical_query(nouns, user_input):
+    return {'nouns': sorted(set(nouns)), 'filters': store_filter.match_predicates(user_input)}
 
-    if '해변가'in user_input or '바닷가'in user_input or '바다 근처'in user_input or '해안가'in user_input:
-        filtered_data = filtered_data[filtered_data['seaside'] == True]
-    if '해변가 아닌'in user_input or '바닷가 아닌'in user_input or '바다 근처 아닌'in user_input or '해안가 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['seaside'] == False]
-
-    if '대학교'in user_input or '대학'in user_input or '대학 근처'in user_input or '학교 근처'in user_input:
-        filtered_data = filtered_data[filtered_data['university'] == True]
-    if '대학교 아닌'in user_input or '대학 아닌'in user_input or '대학 근처 아닌'in user_input or '학교 근처 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['university'] == False]
-
-    if '터미널'in user_input or '버스터미널'in user_input or '터미널 근처'in user_input or '터미널 주변'in user_input:
-        filtered_data = filtered_data[filtered_data['terminal'] == True]
-    if '터미널 아닌'in user_input or '버스터미널 아닌'in user_input or '터미널 근처 아닌'in user_input or '터미널 주변 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['terminal'] == False]
-
-    if '리조트'in user_input or '리조트 근처'in user_input or '리조트 주변'in user_input or '휴양지'in user_input:
-        filtered_data = filtered_data[filtered_data['resort'] == True]
-    if '리조트 아닌'in user_input or '리조트 근처 아닌'in user_input or '리조트 주변 아닌'in user_input or '휴양지 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['resort'] == False]
-
-    if '병원'in user_input or '병원 근처'in user_input or '의료기관'in user_input or '의료시설'in user_input:
-        filtered_data = filtered_data[filtered_data['hospital'] == True]
-    if '병원 아닌'in user_input or '병원 근처 아닌'in user_input or '의료기관 아닌'in user_input or '의료시설 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['hospital'] == False]
-
-    if '매장내'in user_input or '매장 내'in user_input or '가게 안'in user_input or '상점 내'in user_input:
-        filtered_data = filtered_data[filtered_data['inStore'] == True]
-    if '매장내 아닌'in user_input or '매장 내 아닌'in user_input or '가게 안 아닌'in user_input or '상점 내 아닌'in user_input:
-        filtered_data = filtered_data[filtered_data['inStore'] == False]
-
-    if '지하철' in user_input or '지하철역' in user_input or '지하철 근처' in user_input or '지하철 주변' in user_input:
-        filtered_data = filtered_data[filtered_data['subway'] == True]
-    if '지하철 아닌' in user_input or '지하철역 아닌' in user_input or '지하철 근처 아닌' in user_input or '지하철 주변 아닌' in user_input:
-        filtered_data = filtered_data[filtered_data['subway'] == False]
-
-    if '장애인편의시설' in user_input or '장애인 편의 시설' in user_input or '장애인 접근 가능' in user_input or '장애인 지원' in user_input:
-        filtered_data = filtered_data[filtered_data['theDisabled'] == True]
-    if '장애인편의시설 아닌' in user_input or '장애인 편의 시설 아닌' in user_input or '장애인 접근 불가' in user_input or '장애인 지원 불가' in user_input:
-        filtered_data = filtered_data[filtered_data['theDisabled'] == False]
-
-    if '공기청정기' in user_input or 'in어 클리너' in user_input or '공기 청정' in user_input or '공기 정화' in user_input:
-        filtered_data = filtered_data[filtered_data['airCleaner'] == True]
-    if '공기청정기 없는' in user_input or 'in어 클리너 없는' in user_input or '공기 청정 안 되는' in user_input or '공기 정화 안 되는' in user_input:
-        filtered_data = filtered_data[filtered_data['airCleaner'] == False]
-
-    if '전기차충전소' in user_input or '전기차 충전' in user_input or 'EV 충전' in user_input or '전기차 충전 가능' in user_input:
-        filtered_data = filtered_data[filtered_data['electricVehicleCharging'] == True]
-    if '전기차충전소 없는' in user_input or '전기차 충전 안 되는' in user_input or 'EV 충전 불가' in user_input or '전기차 충전 불가능' in user_input:
-        filtered_data = filtered_data[filtered_data['electricVehicleCharging'] == False]
-
-    return filtered_data
-
-# 입력 해시를 생성하는 함수
-def generate_input_hash(user_input):
-    return hashlib.md5(user_input.encode()).hexdigest()
+# 입력 해시를 생성하는 함수 (정규형 + 데이터 버전, 불용어, 기준치, 결과 개수, 시작 위치 포함)
+# (추천 계산 스냅샷 안에서 호출)
+def generate_input_hash(nouns, user_input, top_k=TOP_N, offset=0, scoring=SCORING_MODE):
+    return make_cache_key(
+        canonical_query(nouns, user_input), active_catalog.data_version, stopwords, SIMILARITY_THRESHOLD, top_k, offset,
+        {'shortlist': SHORTLIST_SIZE, 'profile_weighting': PROFILE_WEIGHTING, 'scoring': scoring},
+    )
 
 # 캐시된 결과를 저장하는 함수
-def save_to_cache(input_hash, results):
-    cache_file_path = os.path.join(CACHE_DIR, f"{input_hash}.json")
-    with open(cache_file_path, 'w') as cache_file:
-        json.dump(results, cache_file)
+# tags: 매장 증분 업데이트 시 이 결과가 영향을 받는지 판정하는 데 쓰는 정보 (입력, 명사, 점수 방식)
+def save_to_cache(input_hash, results, tags=None):
+    result_cache.put(input_hash, results, tags)
 
 # 캐시된 결과를 불러오는 함수
 def load_from_cache(input_hash):
-    cache_file_path = os.path.join(CACHE_DIR, f"{input_hash}.json")
-    if os.path.exists(cache_file_path):
-        with open(cache_file_path, 'r') as cache_file:
-            return json.load(cache_file)
-    return None
-
-def recommend_stores(user_input):
+    return result_cache.get(input_hash)
+
+# 클라이언트가 연결을 끊어 계산을 중단한 경우 (cancel 이벤트가 설정됨)
+class RequestCancelled(Exception):
+    pass
+
+# 계산 단계 사이에서 취소 여부 확인 (cancel: threading.Event 또는 None)
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise RequestCancelled()
+
+# 추천 결과 페이지 형식
+# shortlisted: 1단계 후보 선정으로 프로필 상위 SHORTLIST_SIZE 개 매장 안에서만 순위를 매긴 결과인지
+# (True 이면 total / next_offset 도 후보 안의 매장 기준이라, 페이지를 넘겨도 SHORTLIST_SIZE 개를 넘지 않음)
+def build_page(store_names, scores, total, top_k, offset, shortlisted=False):
+    return {
+        'results': [{'Store_Name': name, 'score': float(score)} for name, score in zip(store_names, scores)],
+        'total': total,
+        'next_offset': offset + top_k if offset + top_k < total else None,
+        'shortlisted': shortlisted,
+    }
+
+# 추천 결과 한 페이지 계산 함수
+# top_k: 반환할 매장 수, offset: 건너뛸 순위 수 (다음 페이지는 반환된 next_offset 사용), scoring: 점수 방식
+# cancel: 설정되면 다음 단계 전에 RequestCancelled 로 중단 (API 서버에서 클라이언트 연결이 끊긴 경우)
+# 반환: {'results': [{'Store_Name', 'score'}, ...], 'total': 점수가 0 보다 큰 매장 수, 'next_offset': 다음 페이지 시작 위치 또는 None,
+#        'shortlisted': 후보 선정 적용 여부 (build_page 참고)}
+def recommend_page(user_input, top_k=TOP_N, offset=0, scoring=SCORING_MODE, cancel=None):
     start_time = time.time()  # 시간 측정 시작
 
-    # 사용자 입력 해시 생성
-    input_hash = generate_input_hash(user_input)
-    
-    # 캐시된 결과 불러오기 시도
-    cached_results = load_from_cache(input_hash)
-    if cached_results:
-        return cached_results
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"top_k 는 1 이상 {MAX_TOP_K} 이하로 입력하세요.")
+    if offset < 0:
+        raise ValueError("offset 은 0 이상으로 입력하세요.")
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"점수 방식은 {', '.join(SCORING_MODES)} 중 하나로 입력하세요.")
 
     # 사용자 입력에서 명사 추출
     nouns = extract_nouns(user_input)
     if not nouns:
         raise ValueError("추출도중 오류발생. 명사를 포함한 입력을 하세요.")
-    
-    # 사용자 입력 명사 임베딩
-    user_embeddings = get_embeddings_with_cache(nouns)
-    
-    # 원본 데이터 로드
-    file_path = './data/스타벅스추천모델빈도.csv'  # 이 경로를 실제 데이터 파일 경로로 수정하세요.
-    data = pd.read_csv(file_path)
-    
-    # 데이터 필터링
-    filtered_data = filter_data(data, user_input)
-    
-    # 각 매장의 유사도 계산
-    store_scores = []
-    for index, row in filtered_data.iterrows():
-        frequency_dict = ast.literal_eval(row['frequency'])
-        store_score = 0
-        
-        for noun, freq in frequency_dict.items():
-            if noun in embedding_cache:
-                word_embedding = embedding_cache[noun]
-            else:
-                word_embedding = get_embeddings_with_cache([noun])[0]
-            
-            similarities = cosine_similarity(user_embeddings, [word_embedding])
-            max_similarity = similarities.max()
-            
-            if max_similarity >= 0.99:  # 유사도 기준치
-                store_score += freq
-        
-        store_scores.append(store_score)
-        
-        # 매장 유사도 계산 중간 결과 출력
-        print(f"매장 {index} - 점수: {store_score}")
-    
-    # 각 매장의 점수를 데이터프레임에 추가
-    filtered_data['score'] = store_scores
-    
-    # 추천 매장 정렬
-    recommended_stores = filtered_data.sort_values(by='score', ascending=False)
-    
-    end_time = time.time()  # 시간 측정 종료
-    print(f"추천 계산에 소요된 시간: {end_time - start_time:.2f}초")
+    check_cancelled(cancel)
+
+    # 미리 파싱된 매장 카탈로그 (요청마다 CSV 를 다시 읽지 않음, 원본이 바뀌었으면 스냅샷 교체)
+    load_store_catalog()
+
+    # 이후 계산은 같은 스냅샷에서 (증분 업데이트 중에도 카탈로그/어휘/필터가 서로 맞는 상태)
+    with snapshot_lock.reading():
+        catalog = active_catalog
+
+        # 입력 정규형 해시 생성
+        input_hash = generate_input_hash(nouns, user_input, top_k, offset, scoring)
+
+        # 캐시된 결과 불러오기 시도
+        cached_page = load_from_cache(input_hash)
+        if cached_page is not None:
+            return cached_page
+
+        # 사용자 입력 명사와 유사도 기준치 이상인 어휘 검색
+        matched_terms = match_user_nouns(nouns)[catalog_vocab_rows]
+        check_cancelled(cancel)
+
+        # 데이터 필터링: 규칙 마스크 AND 결과를 행렬의 행 부분집합으로 사용
+        filtered_rows = np.flatnonzero(store_filter.mask(user_input))
+
+        # 1단계 후보 선정: 매장 프로필 내적 상위 SHORTLIST_SIZE 개만 남김 (정확 점수는 후보에만 계산)
+        shortlisted = bool(SHORTLIST_SIZE) and len(filtered_rows) > SHORTLIST_SIZE
+        if shortlisted:
+            filtered_rows = shortlist_stores(store_profiles, query_profile_vector(nouns), filtered_rows, SHORTLIST_SIZE)
+        check_cancelled(cancel)
+
+        # 각 매장의 점수 계산: 유사도 기준치를 넘은 명사들의 가중치 합 (점수 방식별 미리 계산된 행렬과 희소 행렬-벡터 곱 1회)
+        store_scores = score_stores(catalog.scoring_matrix(scoring), matched_terms, filtered_rows)
 
-    # 추천 결과 저장
-    results = recommended_stores[['Store_Name', 'score']].head(10).to_dict(orient='records')
-    save_to_cache(input_hash, results)
+        # 상위 매장 선택: 점수 0 인 매장 제외, 전체 정렬/데이터프레임 복사 없이 부분 선택
+        selected = select_top_k(store_scores, top_k, offset)
+        store_names = catalog.stores['Store_Name'].to_numpy()[filtered_rows[selected]]
 
-    # 추천 결과 반환
-    return results
+        end_time = time.time()  # 시간 측정 종료
+        print(f"추천 계산에 소요된 시간: {end_time - start_time:.2f}초")
+
+        # 추천 결과 저장
+        page = build_page(store_names, store_scores[selected], int(np.count_nonzero(store_scores)), top_k, offset, shortlisted)
+        save_to_cache(input_hash, page, {'input': user_input, 'nouns': nouns, 'scoring': scoring})
+
+        # 추천 결과 반환
+        return page
+
+# 추천 매장 리스트 반환 함수 (상위 top_k 개)
+def recommend_stores(user_input, top_k=TOP_N, offset=0, scoring=SCORING_MODE):
+    return recommend_page(user_input, top_k, offset, scoring)['results']
+
+# 여러 입력의 추천을 한 번에 계산하는 함수 (야간 사전 계산 등)
+# 명사 일괄 추출 → 고유 명사만 한 번에 매칭 → 질의×단어 매칭 행렬과 매장×단어 빈도 행렬의 곱 → 질의별 필터 마스크
+# 반환: 입력 순서대로 recommend_page 와 같은 형식의 첫 페이지 (명사가 없는 입력은 None), 결과는 캐시에도 저장
+# cancel: recommend_page 와 같음 (단계 사이에서 확인)
+def recommend_batch(user_inputs, top_k=TOP_N, workers=None, scoring=SCORING_MODE, cancel=None):
+    start_time = time.time()  # 시간 측정 시작
+
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise ValueError(f"top_k 는 1 이상 {MAX_TOP_K} 이하로 입력하세요.")
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"점수 방식은 {', '.join(SCORING_MODES)} 중 하나로 입력하세요.")
+
+    load_store_catalog()
+
+    # 이후 계산은 같은 스냅샷에서
+    with snapshot_lock.reading():
+        catalog = active_catalog
+        nouns_list = extract_nouns_many(user_inputs)
+        check_cancelled(cancel)
+
+        pages = [None] * len(user_inputs)
+        pending = []
+        for position, (user_input, nouns) in enumerate(zip(user_inputs, nouns_list)):
+            if not nouns:
+                continue
+            input_hash = generate_input_hash(nouns, user_input, top_k, 0, scoring)
+            pages[position] = load_from_cache(input_hash)
+            if pages[position] is None:
+                pending.append((position, input_hash))
+
+        if pending:
+            # 고유 명사별 유사 어휘 → 카탈로그 단어 열 번호
+            unique_nouns = list(dict.fromkeys(noun for position, _ in pending for noun in nouns_list[position]))
+            neighbours = match_nouns_individually(unique_nouns)
+            check_cancelled(cancel)
+            term_columns = []
+            for position, _ in pending:
+                vocab_mask = np.zeros(len(vocab_matrix), dtype=bool)
+                for noun in nouns_list[position]:
+                    vocab_mask[neighbours[noun]] = True
+                term_columns.append(np.flatnonzero(vocab_mask[catalog_vocab_rows]))
+
+            match_matrix = build_match_matrix(term_columns, len(catalog.terms))
+            filter_masks = np.array([store_filter.mask(user_inputs[position]) for position, _ in pending])
+
+            # 1단계 후보 선정 (recommend_page 와 같은 결과가 되도록 필터 마스크를 후보로 좁힘)
+            shortlisted = np.zeros(len(pending), dtype=bool)
+            if SHORTLIST_SIZE:
+                noun_vectors = dict(zip(unique_nouns, embed_user_nouns(unique_nouns)))
+                for query, (mask, (position, _)) in enumerate(zip(filter_masks, pending)):
+                    rows = np.flatnonzero(mask)
+                    if len(rows) > SHORTLIST_SIZE:
+                        shortlisted[query] = True
+                        query_vector = normalize_rows(np.mean([noun_vectors[noun] for noun in dict.fromkeys(nouns_list[position])], axis=0))[0]
+                        mask[:] = False
+                        mask[shortlist_stores(store_profiles, query_vector, rows, SHORTLIST_SIZE)] = True
+            check_cancelled(cancel)
+            ranked = rank_queries(catalog.scoring_matrix(scoring), match_matrix, filter_masks, top_k, workers)
+
+            store_names = catalog.stores['Store_Name'].to_numpy()
+            for (position, input_hash), (rows, scores, total), query_shortlisted in zip(pending, ranked, shortlisted):
+                pages[position] = build_page(store_names[rows], scores, total, top_k, 0, bool(query_shortlisted))
+                tags = {'input': user_inputs[position], 'nouns': nouns_list[position], 'scoring': scoring}
+                save_to_cache(input_hash, pages[position], tags)
+
+    end_time = time.time()  # 시간 측정 종료
+    print(f"배치 추천 {len(user_inputs)}건 (새로 계산 {len(pending)}건) 소요 시간: {end_time - start_time:.2f}초")
+    return pages
 
 if __name__ == "__main__":
+    init()
+
+    # 오프라인 어휘 인덱스 생성: python "(본)스타벅스추천모델.py" --build-vocab
+    if '--build-vocab' in sys.argv:
+        prepare_vocab_index(get_catalog(DATA_FILE).terms, rebuild=True)
+        print("어휘 임베딩 인덱스 저장 완료")
+        sys.exit(0)
+
+    # 시작 시 매장 카탈로그와 어휘 인덱스 미리 로드
+    load_store_catalog()
+
+    # 오프라인 이웃 목록 생성: python "(본)스타벅스추천모델.py" --build-neighbours
+    if '--build-neighbours' in sys.argv:
+        prepare_neighbour_table()
+        print("어휘 이웃 목록 저장 완료")
+        sys.exit(0)
+
+    # IVF 근사 검색 재현율 측정 (어휘 중 500개를 질의로 사용, 전수 비교 결과와 비교)
+    if '--ann-recall' in sys.argv:
+        sample = np.random.default_rng(0).choice(len(vocab_matrix), min(500, len(vocab_matrix)), replace=False)
+        print("IVF 재현율:", measure_recall(vocab_ann, vocab_matrix[sample], SIMILARITY_THRESHOLD))
+        sys.exit(0)
+
+    # 매장 프로필 후보 선정 재현율 측정 (카탈로그 단어 1~3개 조합 200개를 질의로 사용, 전체 매장 정확 점수와 비교)
+    if '--shortlist-recall' in sys.argv:
+        catalog = active_catalog
+        rng = np.random.default_rng(0)
+        queries = [[str(term) for term in rng.choice(catalog.terms, rng.integers(1, 4), replace=False)] for _ in range(200)]
+        print("후보 선정 재현율:", measure_shortlist_recall(
+            catalog.term_matrix, store_profiles, [query_profile_vector(nouns) for nouns in queries],
+            [match_user_nouns(nouns)[catalog_vocab_rows] for nouns in queries], SHORTLIST_SIZE or len(catalog.stores), TOP_N,
+        ))
+        sys.exit(0)
+
+    # 배치 추천: python "(본)스타벅스추천모델.py" --batch 입력파일(한 줄에 입력 하나) 출력파일(.jsonl)
+    if '--batch' in sys.argv:
+        input_path, output_path = sys.argv[sys.argv.index('--batch') + 1:sys.argv.index('--batch') + 3]
+        with open(input_path, encoding='utf-8') as f:
+            user_inputs = [line.strip() for line in f if line.strip()]
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for user_input, page in zip(user_inputs, recommend_batch(user_inputs)):
+                f.write(json.dumps({'query': user_input, **(page or {'results': []})}, ensure_ascii=False) + '\n')
+        print(f"배치 추천 결과 저장 완료: {output_path}")
+        sys.exit(0)
+
     user_input = input("사용자 입력을 입력하세요: ")
     recommendations = recommend_stores(user_input)
-    print("추천 매장:", recommendations)
\ No newline at end of file
+    print("추천 매장:", recommendations)
+    print("결과 캐시 통계:", result_cache.get_stats())
\ No newline at end of file
@@ -0,0 +1,98 @@
+import re
+
+import numpy as np
+
+# 시/도 표기 → 대표 이름 (개편 전후 명칭과 약칭을 같은 단위로 묶음)
+SIDO_ALIASES = {
+    '서울특별시': '서울', '서울시': '서울', '서울': '서울',
+    '부산광역시': '부산', '부산시': '부산', '부산': '부산',
+    '대구광역시': '대구', '대구시': '대구', '대구': '대구',
+    '인천광역시': '인천', '인천시': '인천', '인천': '인천',
+    '광주광역시': '광주', '광주': '광주',
+    '대전광역시': '대전', '대전시': '대전', '대전': '대전',
+    '울산광역시': '울산', '울산시': '울산', '울산': '울산',
+    '세종특별자치시': '세종', '세종시': '세종', '세종': '세종',
+    '경기도': '경기', '경기': '경기',
+    '강원특별자치도': '강원', '강원도': '강원', '강원': '강원',
+    '충청북도': '충북', '충북': '충북',
+    '충청남도': '충남', '충남': '충남',
+    '전북특별자치도': '전북', '전라북도': '전북', '전북': '전북',
+    '전라남도': '전남', '전남': '전남',
+    '경상북도': '경북', '경북': '경북',
+    '경상남도': '경남', '경남': '경남',
+    '제주특별자치도': '제주', '제주도': '제주', '제주': '제주',
+}
+
+# 주소 괄호 안의 동 이름 (예: '(문현동)', '(역삼동, 빌딩명)', '(가람동 406)')
+DONG_PATTERN = re.compile(r'\(([^,)\s]+?(?:동|가|읍|면|리))[\s,)]')
+
+
+# 주소 문자열을 (시/도, [시/군/구 ...], 동) 으로 분해하는 함수
+# 예: '경기도 성남시 분당구 분당수서로 477 (정자동)' → ('경기', ['성남시', '분당구'], '정자동')
+def parse_address(address):
+    if not isinstance(address, str):
+        return None, [], None
+    tokens = address.split()
+    if not tokens:
+        return None, [], None
+
+    sido = SIDO_ALIASES.get(tokens[0])
+    rest = tokens[1:] if sido else tokens
+
+    sigungu = []
+    if rest and rest[0].endswith(('시', '군', '구')):
+        sigungu.append(rest[0])
+        # 일반구가 있는 시 (예: 성남시 분당구)
+        if rest[0].endswith('시') and len(rest) > 1 and rest[1].endswith('구'):
+            sigungu.append(rest[1])
+
+    dong = None
+    match = DONG_PATTERN.search(address)
+    if match:
+        dong = match.group(1).strip()
+    else:
+        for token in rest[len(sigungu):len(sigungu) + 1]:
+            if token.endswith(('읍', '면', '동')):
+                dong = token
+    return sido, sigungu, dong
+
+
+# 행정구역 단위(시/도, 시/군/구, 동) → 매장 행 번호 역색인
+class AddressIndex:
+    def __init__(self, addresses):
+        self.size = len(addresses)
+        self.sido = []
+        self.units = {'sido': {}, 'sigungu': {}, 'dong': {}}
+
+        for row, address in enumerate(addresses):
+            sido, sigungu, dong = parse_address(address)
+            self.sido.append(sido)
+            if sido:
+                self.units['sido'].setdefault(sido, []).append(row)
+            for name in sigungu:
+                self.units['sigungu'].setdefault(name, []).append(row)
+            if dong:
+                self.units['dong'].setdefault(dong, []).append(row)
+
+        self.units = {
+            level: {name: np.asarray(rows, dtype=np.int64) for name, rows in names.items()}
+            for level, names in self.units.items()
+        }
+
+    # 단위 이름에 해당하는 매장 행 번호 배열
+    def rows(self, level, name):
+        if level == 'sido':
+            name = SIDO_ALIASES.get(name, name)
+        return self.units[level].get(name, np.zeros(0, dtype=np.int64))
+
+    # 단위 조건에 해당하는 매장 마스크
+    # value 가 (시/도, 이름) 튜플이면 해당 시/도 안의 단위만 선택 (예: ('경기', '광주시'))
+    def mask(self, level, value):
+        mask = np.zeros(self.size, dtype=bool)
+        if isinstance(value, tuple):
+            sido, name = value
+            mask[self.rows(level, name)] = True
+            mask &= self.mask('sido', sido)
+        else:
+            mask[self.rows(level, value)] = True
+        return mask
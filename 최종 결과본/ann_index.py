@@ -0,0 +1,110 @@
+import numpy as np
+
+# 행렬곱을 나눠서 계산할 행 수 (메모리 사용량 제한)
+CHUNK_SIZE = 4096
+
+
+# 정규화된 벡터들의 가장 가까운(내적이 가장 큰) 중심점 번호
+def nearest_centroids(vectors, centroids):
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), CHUNK_SIZE):
+        assignments[start:start + CHUNK_SIZE] = np.argmax(vectors[start:start + CHUNK_SIZE] @ centroids.T, axis=1)
+    return assignments
+
+
+# 구면 k-평균 (코사인 유사도 기준 군집화)
+def spherical_kmeans(vectors, clusters, iterations=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        centroids[~empty] = sums[~empty] / norms[~empty]  # 빈 군집은 이전 중심점 유지
+    return centroids
+
+
+# 어휘 벡터용 IVF(역파일) 색인: 중심점으로 군집을 나누고, 질의와 가까운 군집 몇 개만 정확히 비교
+# 벡터는 L2 정규화되어 있어야 하며 (내적 = 코사인 유사도), 색인 파일에는 군집 정보만 저장
+class IVFIndex:
+    def __init__(self, vectors, centroids, list_ids, list_offsets, nprobe=8):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_ids = list_ids
+        self.list_offsets = list_offsets
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, vectors, nlist=None, nprobe=8, iterations=10, sample_size=50000, seed=0):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if nlist is None:
+            nlist = max(1, int(4 * np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors if len(vectors) <= sample_size else vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = spherical_kmeans(sample, nlist, iterations, seed).astype(np.float32)
+
+        assignments = nearest_centroids(vectors, centroids)
+        list_ids = np.argsort(assignments, kind='stable')
+        list_offsets = np.searchsorted(assignments[list_ids], np.arange(nlist + 1))
+        return cls(vectors, centroids, list_ids, list_offsets, nprobe)
+
+    # 벡터가 뒤에 추가된 행렬로 확장한 새 색인 (중심점은 그대로, 새 벡터만 가장 가까운 군집에 배정)
+    def extended(self, vectors):
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        assignments[self.list_ids] = np.repeat(np.arange(len(self.centroids)), np.diff(self.list_offsets))
+        assignments[len(self.list_ids):] = nearest_centroids(vectors[len(self.list_ids):], self.centroids)
+        list_ids = np.argsort(assignments, kind='stable')
+        list_offsets = np.searchsorted(assignments[list_ids], np.arange(len(self.centroids) + 1))
+        return IVFIndex(vectors, self.centroids, list_ids, list_offsets, self.nprobe)
+
+    def save(self, path):
+        np.savez(path, centroids=self.centroids, list_ids=self.list_ids, list_offsets=self.list_offsets, nprobe=self.nprobe)
+
+    # 저장된 군집 정보를 벡터 행렬과 다시 연결 (벡터 수가 다르면 None → 다시 생성 필요)
+    @classmethod
+    def load(cls, path, vectors):
+        arrays = np.load(path)
+        if len(arrays['list_ids']) != len(vectors):
+            return None
+        return cls(vectors, arrays['centroids'], arrays['list_ids'], arrays['list_offsets'], int(arrays['nprobe']))
+
+    # 반경 검색: 질의별로 유사도가 threshold 이상인 벡터 번호 배열 목록
+    def range_search(self, queries, threshold, nprobe=None):
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        results = []
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate([self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists])
+            similarities = self.vectors[candidates] @ query
+            results.append(candidates[similarities >= threshold])
+        return results
+
+    # 질의 중 하나라도 threshold 이상인 벡터 위치를 True 로 표시한 마스크 (match_vocabulary 와 같은 형태)
+    def match(self, queries, threshold, nprobe=None):
+        mask = np.zeros(len(self.vectors), dtype=bool)
+        for neighbours in self.range_search(queries, threshold, nprobe):
+            mask[neighbours] = True
+        return mask
+
+
+# 정확한 전수 비교 대비 IVF 반경 검색의 재현율 측정
+# 반환: 재현율, 질의당 평균 비교 벡터 비율
+def measure_recall(index, queries, threshold, nprobe=None):
+    queries = np.asarray(queries, dtype=np.float32)
+    exact = [np.flatnonzero(similarities >= threshold) for similarities in queries @ index.vectors.T]
+    approximate = index.range_search(queries, threshold, nprobe)
+
+    found = sum(len(np.intersect1d(e, a)) for e, a in zip(exact, approximate))
+    total = sum(len(e) for e in exact)
+
+    nprobe = min(nprobe or index.nprobe, len(index.centroids))
+    probes = np.argpartition(-(queries @ index.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+    list_sizes = np.diff(index.list_offsets)
+    scanned = list_sizes[probes].sum(axis=1).mean() / len(index.vectors)
+    return {'recall': found / total if total else 1.0, 'scanned_ratio': float(scanned)}
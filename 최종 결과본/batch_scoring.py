@@ -0,0 +1,65 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from term_matrix import select_top_k
+
+# 한 번에 점수를 계산할 질의 수 (매장×질의 점수 블록을 밀집 행렬로 펼치는 크기)
+QUERY_CHUNK_SIZE = 256
+
+# 이 수 이상의 질의는 여러 프로세스로 나눠 계산
+PARALLEL_MIN_QUERIES = 2048
+
+# 워커 프로세스마다 한 번만 전달받는 매장×단어 빈도 행렬
+_worker_term_matrix = None
+
+
+# 질의별 매칭 단어(열 번호) 목록 → 질의×단어 희소 매칭 행렬
+def build_match_matrix(term_columns, term_count):
+    indptr = np.cumsum([0] + [len(columns) for columns in term_columns])
+    indices = np.concatenate(term_columns).astype(np.int32) if term_columns else np.zeros(0, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.float32)
+    return csr_matrix((data, indices, indptr), shape=(len(term_columns), term_count))
+
+
+# 질의 묶음의 순위 계산: (매장×단어) @ (단어×질의) 희소 행렬곱 1회 후 질의별 필터 마스크 적용
+# 반환: 질의별 (매장 행 번호 배열, 점수 배열, 점수가 0 보다 큰 매장 수)
+def rank_chunk(term_matrix, match_matrix, filter_masks, top_k):
+    scores = (term_matrix @ match_matrix.T).toarray()
+    ranked = []
+    for query, mask in enumerate(filter_masks):
+        rows = np.flatnonzero(mask)
+        query_scores = scores[rows, query]
+        selected = select_top_k(query_scores, top_k)
+        ranked.append((rows[selected], query_scores[selected], int(np.count_nonzero(query_scores))))
+    return ranked
+
+
+def _init_worker(term_matrix):
+    global _worker_term_matrix
+    _worker_term_matrix = term_matrix
+
+
+def _rank_chunk_in_worker(match_matrix, filter_masks, top_k):
+    return rank_chunk(_worker_term_matrix, match_matrix, filter_masks, top_k)
+
+
+# 여러 질의의 순위를 한 번에 계산 (질의 수가 많으면 QUERY_CHUNK_SIZE 단위로 나눠 여러 코어에서 실행)
+# match_matrix: 질의×단어 희소 행렬, filter_masks: 질의별 매장 마스크 (질의×매장 bool 배열)
+def rank_queries(term_matrix, match_matrix, filter_masks, top_k, workers=None):
+    chunks = [
+        (match_matrix[start:start + QUERY_CHUNK_SIZE], filter_masks[start:start + QUERY_CHUNK_SIZE])
+        for start in range(0, match_matrix.shape[0], QUERY_CHUNK_SIZE)
+    ]
+    if match_matrix.shape[0] < PARALLEL_MIN_QUERIES or workers == 1:
+        return [ranked for chunk in chunks for ranked in rank_chunk(term_matrix, *chunk, top_k)]
+
+    # spawn: 모델/스레드를 가진 부모 프로세스를 복제하지 않음
+    # 워커는 부모의 실행 스크립트를 __mp_main__ 으로 다시 불러오므로, 실행 스크립트는 모델 로드 등을
+    # 최상단이 아닌 init() / if __name__ == "__main__" 안에서 해야 함 (추천 모델 스크립트는 init() 사용)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(term_matrix,)) as pool:
+        futures = [pool.submit(_rank_chunk_in_worker, *chunk, top_k) for chunk in chunks]
+        return [ranked for future in futures for ranked in future.result()]
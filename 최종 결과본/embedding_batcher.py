@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+# 대기 중인 임베딩 요청 하나
+class _PendingRequest:
+    def __init__(self, words):
+        self.words = words
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# 동시에 들어온 여러 요청의 단어를 잠깐 모아 한 번의 모델 호출로 계산하는 스케줄러
+# - 첫 요청이 들어온 뒤 max_wait(초)가 지나거나, 모은 고유 단어 수가 max_batch_size 에 닿으면 실행
+# - 요청 사이 중복 단어는 한 번만 계산하고, 결과는 각 요청의 단어 순서대로 돌려줌
+class EmbeddingBatcher:
+    def __init__(self, compute_fn, max_batch_size=64, max_wait=0.005):
+        self.compute_fn = compute_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue = queue.Queue()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'batches': 0, 'requests': 0, 'words': 0, 'max_batch_words': 0,
+            'queue_wait_total': 0.0, 'queue_wait_max': 0.0, 'batch_size_histogram': {},
+        }
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    # 단어 리스트의 임베딩 (요청한 스레드는 배치 계산이 끝날 때까지 대기)
+    def embed(self, words):
+        request = _PendingRequest(list(words))
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        words = dict.fromkeys(first.words)
+        deadline = first.enqueued + self.max_wait
+        while len(words) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(request)
+            words.update(dict.fromkeys(request.words))
+        return batch, list(words)
+
+    def _run(self):
+        while True:
+            batch, words = self._collect()
+            started = time.monotonic()
+            try:
+                vectors = dict(zip(words, self.compute_fn(words)))
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+
+            self._record(batch, words, started)
+            for request in batch:
+                request.result = np.array([vectors[word] for word in request.words])
+                request.done.set()
+
+    def _record(self, batch, words, started):
+        waits = [started - request.enqueued for request in batch]
+        bucket = 1 << (len(words) - 1).bit_length()  # 배치 크기 구간 (1, 2, 4, 8, ...)
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics['batches'] += 1
+            metrics['requests'] += len(batch)
+            metrics['words'] += len(words)
+            metrics['max_batch_words'] = max(metrics['max_batch_words'], len(words))
+            metrics['queue_wait_total'] += sum(waits)
+            metrics['queue_wait_max'] = max(metrics['queue_wait_max'], max(waits))
+            metrics['batch_size_histogram'][bucket] = metrics['batch_size_histogram'].get(bucket, 0) + 1
+
+    # 처리량/지연 조정용 지표: 배치 수, 배치당 평균 단어·요청 수, 대기 시간(ms), 배치 크기 분포
+    def get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics, batch_size_histogram=dict(sorted(self._metrics['batch_size_histogram'].items())))
+        batches = metrics['batches'] or 1
+        requests = metrics['requests'] or 1
+        return {
+            'batches': metrics['batches'],
+            'requests': metrics['requests'],
+            'words': metrics['words'],
+            'avg_batch_words': metrics['words'] / batches,
+            'avg_batch_requests': metrics['requests'] / batches,
+            'max_batch_words': metrics['max_batch_words'],
+            'avg_queue_wait_ms': metrics['queue_wait_total'] / requests * 1000,
+            'max_queue_wait_ms': metrics['queue_wait_max'] * 1000,
+            'batch_size_histogram': metrics['batch_size_histogram'],
+            'queue_depth': self._queue.qsize(),
+        }
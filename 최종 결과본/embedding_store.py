@@ -0,0 +1,114 @@
+import fcntl
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+# 영구 임베딩 저장소 경로
+EMBEDDING_STORE_DIR = './data/embeddings'
+VECTORS_FILE = 'vectors.f32'
+INDEX_FILE = 'index.jsonl'
+META_FILE = 'meta.json'
+LOCK_FILE = 'write.lock'
+
+
+# (모델 이름, 풀링 방식) 별 디스크 임베딩 저장소
+# - vectors.f32: float32 벡터를 행 단위로 이어 붙인 파일 (읽기 전용 memmap 으로 열어 여러 프로세스가 페이지 공유)
+# - index.jsonl: 단어 → 행 번호 (한 줄에 하나씩 추가)
+# 쓰기는 파일 잠금으로 한 프로세스만 수행하고, 벡터를 먼저 기록한 뒤 인덱스를 추가하므로
+# 읽는 쪽은 잠금 없이 인덱스에 완전히 기록된 줄만 읽으면 항상 유효한 행을 보게 됨
+class EmbeddingStore:
+    def __init__(self, model_name, pooling, store_dir=EMBEDDING_STORE_DIR, readonly=False):
+        self.model_name = model_name
+        self.pooling = pooling
+        self.readonly = readonly
+        self.path = os.path.join(store_dir, f"{re.sub(r'[^0-9A-Za-z_.-]', '_', model_name)}__{pooling}")
+        if not readonly:
+            os.makedirs(self.path, exist_ok=True)
+
+        self.word_rows = {}
+        self.dim = None
+        self.vectors = None
+        self._index_offset = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __len__(self):
+        return len(self.word_rows)
+
+    def __contains__(self, word):
+        return word in self.word_rows
+
+    # 다른 프로세스가 추가한 단어를 인덱스 파일에서 이어 읽고, 벡터 파일을 다시 매핑
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        if self.dim is None:
+            with open(os.path.join(self.path, META_FILE), 'r', encoding='utf-8') as meta_file:
+                self.dim = json.load(meta_file)['dim']
+
+        with open(index_path, 'rb') as index_file:
+            index_file.seek(self._index_offset)
+            chunk = index_file.read()
+        complete = chunk[:chunk.rfind(b'\n') + 1]  # 기록 중인 마지막 줄은 다음 refresh 때 읽음
+        if not complete:
+            return
+        for line in complete.decode('utf-8').splitlines():
+            entry = json.loads(line)
+            self.word_rows[entry['word']] = entry['row']
+        self._index_offset += len(complete)
+
+        rows = max(self.word_rows.values()) + 1
+        self.vectors = np.memmap(os.path.join(self.path, VECTORS_FILE), dtype=np.float32, mode='r', shape=(rows, self.dim))
+
+    # 저장된 단어들의 벡터를 {단어: 벡터} 로 반환 (없는 단어는 제외)
+    def get_many(self, words):
+        if any(word not in self.word_rows for word in words):
+            self.refresh()
+        return {word: self.vectors[self.word_rows[word]] for word in words if word in self.word_rows}
+
+    # 새로 계산한 벡터 추가 (이미 있는 단어는 건너뜀)
+    def append(self, words, vectors):
+        if self.readonly:
+            raise PermissionError("읽기 전용 임베딩 저장소에는 추가할 수 없습니다.")
+        vectors = np.asarray(vectors, dtype=np.float32)
+
+        with self._lock, open(os.path.join(self.path, LOCK_FILE), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                new_rows = [(word, vector) for word, vector in zip(words, vectors) if word not in self.word_rows]
+                new_rows = list({word: vector for word, vector in new_rows}.items())
+                if not new_rows:
+                    return
+
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    with open(os.path.join(self.path, META_FILE), 'w', encoding='utf-8') as meta_file:
+                        json.dump({'model_name': self.model_name, 'pooling': self.pooling, 'dim': self.dim}, meta_file)
+
+                # 1) 벡터 기록: 행 번호는 벡터 파일 크기 기준 (인덱스에 기록되지 못한 행이 있어도 어긋나지 않음)
+                vectors_path = os.path.join(self.path, VECTORS_FILE)
+                with open(vectors_path, 'ab') as vectors_file:
+                    start_row = vectors_file.tell() // (self.dim * 4)
+                    vectors_file.write(np.stack([vector for _, vector in new_rows]).astype(np.float32).tobytes())
+                    vectors_file.flush()
+                    os.fsync(vectors_file.fileno())
+
+                # 2) 인덱스 기록
+                with open(os.path.join(self.path, INDEX_FILE), 'a', encoding='utf-8') as index_file:
+                    for offset, (word, _) in enumerate(new_rows):
+                        index_file.write(json.dumps({'word': word, 'row': start_row + offset}, ensure_ascii=False) + '\n')
+                    index_file.flush()
+                    os.fsync(index_file.fileno())
+
+                self._refresh()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
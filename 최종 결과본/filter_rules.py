@@ -0,0 +1,437 @@
+import copy
+from collections import deque
+
+import numpy as np
+
+from address_index import AddressIndex
+
+# 필터링 규칙 테이블: (입력 키워드 동의어, 컬럼, 값)
+# sido / sigungu 규칙은 주소 행정구역 색인(address_index.py)으로, 그 외 컬럼은 값이 같은 매장을 선택
+# 서로 다른 키워드의 규칙은 AND, 한 키워드가 여러 규칙에 걸리면 (예: '서울역' → 용산구, 중구) OR 로 결합
+FILTER_RULES = [
+    # 매장 타입 관련 필터링
+    (('리저브', 'Reserve', 'reserve'), 'storeType', '리저브'),
+    (('일반', 'Standard', 'standard'), 'storeType', '일반'),
+    (('드라이브 스루', '드라이브스루', 'drivethrough'), 'storeType', '드라이브스루'),
+
+    # 위치 관련 필터링
+    (('서울시', '서울특별시', '수도'), 'sido', '서울'),
+    (('부산', '부산시', '부산광역시'), 'sido', '부산'),
+    (('대구', '대구시', '대구광역시'), 'sido', '대구'),
+    (('인천', '인천광역시', '인천시'), 'sido', '인천'),
+    (('광주', '광주광역시', 'gwangju'), 'sido', '광주'),
+    (('대전', '대전시', '대전광역시'), 'sido', '대전'),
+    (('울산', '울산시', '울산광역시'), 'sido', '울산'),
+    (('세종', '세종특별시', 'sejong'), 'sido', '세종'),
+    (('경기', '경기도', '수도권'), 'sido', '경기'),
+    (('강원', '강원도', 'gangwon'), 'sido', '강원'),
+    (('충북', '충청북도', 'chungbuk'), 'sido', '충북'),
+    (('충남', '충청남도', 'chungnam'), 'sido', '충남'),
+    (('전북', '전라북도', 'jeonbuk'), 'sido', '전북'),
+    (('전남', '전라남도', 'jeonnam'), 'sido', '전남'),
+    (('경북', '경상북도', 'gyeongbuk'), 'sido', '경북'),
+    (('경남', '경상남도', 'gyeongnam'), 'sido', '경남'),
+    (('제주', 'Jeju', 'jeju'), 'sido', '제주'),
+
+    # 대한민국 시 목록으로 필터링
+
+    # 경기도
+    (('수원시', '수원'), 'sigungu', '수원시'),
+    (('용인시', '용인'), 'sigungu', '용인시'),
+    (('고양시', '고양'), 'sigungu', '고양시'),
+    (('화성시', '화성'), 'sigungu', '화성시'),
+    (('성남시', '성남'), 'sigungu', '성남시'),
+    (('부천시', '부천'), 'sigungu', '부천시'),
+    (('남양주시', '남양주'), 'sigungu', '남양주시'),
+    (('안산시', '안산'), 'sigungu', '안산시'),
+    (('평택시', '평택'), 'sigungu', '평택시'),
+    (('안양시', '안양'), 'sigungu', '안양시'),
+    (('시흥시', '시흥'), 'sigungu', '시흥시'),
+    (('파주시', '파주'), 'sigungu', '파주시'),
+    (('김포시', '김포'), 'sigungu', '김포시'),
+    (('의정부시', '의정부'), 'sigungu', '의정부시'),
+    (('광주시', '경기 광주'), 'sigungu', ('경기', '광주시')),
+    (('하남시', '하남'), 'sigungu', '하남시'),
+    (('광명시', '광명'), 'sigungu', '광명시'),
+    (('군포시', '군포'), 'sigungu', '군포시'),
+    (('양주시', '양주'), 'sigungu', '양주시'),
+    (('오산시', '오산'), 'sigungu', '오산시'),
+    (('이천시', '이천'), 'sigungu', '이천시'),
+    (('안성시', '안성'), 'sigungu', '안성시'),
+    (('구리시', '구리'), 'sigungu', '구리시'),
+    (('의왕시', '의왕'), 'sigungu', '의왕시'),
+    (('포천시', '포천'), 'sigungu', '포천시'),
+
+    # 강원특별자치도
+    (('춘천시', '춘천'), 'sigungu', '춘천시'),
+    (('원주시', '원주'), 'sigungu', '원주시'),
+    (('강릉시', '강릉'), 'sigungu', '강릉시'),
+    (('동해시', '동해'), 'sigungu', '동해시'),
+    (('속초시', '속초'), 'sigungu', '속초시'),
+    (('삼척시', '삼척'), 'sigungu', '삼척시'),
+
+    # 전라남도
+    (('목포시', '목포'), 'sigungu', '목포시'),
+    (('여수시', '여수'), 'sigungu', '여수시'),
+    (('순천시', '순천'), 'sigungu', '순천시'),
+    (('나주시', '나주'), 'sigungu', '나주시'),
+    (('광양시', '광양'), 'sigungu', '광양시'),
+    # 전라북도
+    (('전주시', '전주'), 'sigungu', '전주시'),
+    (('군산시', '군산'), 'sigungu', '군산시'),
+    (('익산시', '익산'), 'sigungu', '익산시'),
+    (('정읍시', '정읍'), 'sigungu', '정읍시'),
+    (('남원시', '남원'), 'sigungu', '남원시'),
+    (('김제시', '김제'), 'sigungu', '김제시'),
+
+    # 경상북도
+    (('포항시', '포항'), 'sigungu', '포항시'),
+    (('경주시', '경주'), 'sigungu', '경주시'),
+    (('김천시', '김천'), 'sigungu', '김천시'),
+    (('안동시', '안동'), 'sigungu', '안동시'),
+    (('구미시', '구미'), 'sigungu', '구미시'),
+    (('영주시', '영주'), 'sigungu', '영주시'),
+    (('영천시', '영천'), 'sigungu', '영천시'),
+    (('상주시', '상주'), 'sigungu', '상주시'),
+    (('문경시', '문경'), 'sigungu', '문경시'),
+    (('경산시', '경산'), 'sigungu', '경산시'),
+
+    # 경상남도
+    (('창원시', '창원'), 'sigungu', '창원시'),
+    (('진주시', '진주'), 'sigungu', '진주시'),
+    (('통영시', '통영'), 'sigungu', '통영시'),
+    (('사천시', '사천'), 'sigungu', '사천시'),
+    (('김해시', '김해'), 'sigungu', '김해시'),
+    (('밀양시', '밀양'), 'sigungu', '밀양시'),
+    (('거제시', '거제'), 'sigungu', '거제시'),
+    (('양산시', '양산'), 'sigungu', '양산시'),
+
+    # 충청남도
+    (('천안시', '천안'), 'sigungu', '천안시'),
+    (('공주시', '공주'), 'sigungu', '공주시'),
+    (('보령시', '보령'), 'sigungu', '보령시'),
+    (('아산시', '아산'), 'sigungu', '아산시'),
+    (('서산시', '서산'), 'sigungu', '서산시'),
+    (('논산시', '논산'), 'sigungu', '논산시'),
+    (('계룡시', '계룡'), 'sigungu', '계룡시'),
+    (('당진시', '당진'), 'sigungu', '당진시'),
+
+    # 충청북도
+    (('청주시', '청주'), 'sigungu', '청주시'),
+    (('충주시', '충주'), 'sigungu', '충주시'),
+    (('제천시', '제천'), 'sigungu', '제천시'),
+
+    # 서울시 지하철 역 입력시 구로 반환
+    # 중구·강서구처럼 다른 광역시에도 있는 구 이름이 있으므로 모두 (시/도, 구) 로 서울에 한정
+    # (구 이름 자체가 여러 광역시에 있는 '중구', '강서구' 는 시/도 없이 두고, '부산 중구' 처럼 시/도 키워드와 함께 좁힘)
+    # 강남구
+    ((
+        '삼성역', '선릉역', '역삼역', '강남역', '압구정역', '신사역', '매봉역', '도곡역', '대치역', '학여울역', '대청역', '일원역', '수서역',
+        '강남구청역', '학동역', '논현역', '신논현역', '언주역', '선정릉역', '삼성중앙역', '봉은사역', '압구정로데오역', '한티역', '구릉역', '개포동역',
+        '대모산역', '청담역', '강남구'
+    ), 'sigungu', ('서울', '강남구')),
+
+    # 강동구
+    ((
+        '천호역', '강동역', '길동역', '굽은다리역', '명일역', '고덕역', '상일동역', '강일역', '둔촌동역', '암사역', '강동구청역', '둔촌오륜역',
+        '중앙보훈병원역', '강동구'
+    ), 'sigungu', ('서울', '강동구')),
+
+    # 강북구
+    ((
+        '미아사거리역', '미아역', '수유역', '솔샘역', '삼양사거리역', '삼양역', '화계역', '가오리역', '4.19민주묘지역', '솔밭공원역', '북한산우이역', '강북구'
+    ), 'sigungu', ('서울', '강북구')),
+
+    # 강서구
+    ((
+        '까치산역', '방화역', '개화산역', '김포공항역', '송정역', '마곡역', '발산역', '우장산역', '화곡역', '공항시장역', '신방화역', '마곡나루역',
+        '양천향교역', '가양역', '증미역', '등촌역', '염창역'
+    ), 'sigungu', ('서울', '강서구')),
+    (('강서구',), 'sigungu', '강서구'),
+
+    # 관악구
+    (('낙성대역', '서울대입구역', '봉천역', '신림역', '당곡역', '서원역', '서울대벤처타운역', '관악산역', '관악구'), 'sigungu', ('서울', '관악구')),
+
+    # 광진구
+    (('건대입구역', '구의역', '강변역', '군자역', '아차산역', '광나루역', '중곡역', '어린이대공원역', '뚝섬유원지역', '광진구'), 'sigungu', ('서울', '광진구')),
+    # 구로구
+    ((
+        '구로역', '구일역', '개봉역', '오류동역', '온수역', '신도림역', '구로디지털단지역', '대림역', '도림천역', '남구로역', '천왕역', '구로구'
+    ), 'sigungu', ('서울', '구로구')),
+
+    # 금천구
+    (('금천구청역', '독산역', '가산디지털단지역', '금천구'), 'sigungu', ('서울', '금천구')),
+
+    # 노원구
+    ((
+        '석계역', '광운대역', '월계역', '노원역', '상계역', '당고개역', '화랑대역', '태릉입구역', '수락산역', '마들역', '중계역', '하계역', '공릉역',
+        '노원구'
+    ), 'sigungu', ('서울', '노원구')),
+
+    # 도봉구
+    (('녹천역', '창동역', '방학역', '도봉역', '도봉산역', '쌍문역', '도봉구'), 'sigungu', ('서울', '도봉구')),
+
+    # 동대문구
+    (('신설동역', '제기동역', '청량리역', '회기역', '외대앞역', '신이문역', '용두역', '답십리역', '장한평역', '동대문구'), 'sigungu', ('서울', '동대문구')),
+
+    # 동작구
+    ((
+        '노량진역', '사당역', '신대방역', '이수역', '총신대입구역', '동작역', '남성역', '숭실대입구역', '상도역', '장승배기역', '신대방삼거리역', '노들역',
+        '흑석역', '보라매공원역', '보라매병원역', '동작구'
+    ), 'sigungu', ('서울', '동작구')),
+
+    # 마포구
+    ((
+        '합정역', '홍대입구역', '신촌역', '이대역', '아현역', '마포역', '공덕역', '애오개역', '대흥역', '광흥창역', '상수역', '망원역', '마포구청역',
+        '월드컵경기장역', '디지털미디어시티역', '서강대역', '마포구'
+    ), 'sigungu', ('서울', '마포구')),
+
+    # 서대문구
+    (('충정로역', '홍제역', '무악재역', '서대문역', '가좌역', '서대문구'), 'sigungu', ('서울', '서대문구')),
+
+    # 서초구
+    ((
+        '교대역', '서초역', '방배역', '잠원역', '고속터미널역', '남부터미널역', '양재역', '남태령역', '반포역', '내방역', '구반포역', '신반포역', '사평역',
+        '양재시민의숲역', '청계산입구역', '서초구'
+    ), 'sigungu', ('서울', '서초구')),
+
+    # 성동구
+    ((
+        '상왕십리역', '왕십리역', '한양대역', '뚝섬역', '성수역', '용답역', '신답역', '금호역', '옥수역', '신금호역', '행당역', '마장역', '응봉역',
+        '서울숲역', '성동구'
+    ), 'sigungu', ('서울', '성동구')),
+
+    # 성북구
+    ((
+        '한성대입구역', '성신여대입구역', '길음역', '돌곶이역', '상월곡역', '월곡역', '고려대역', '안암역', '보문역', '북한산보국문역', '정릉역', '성북구'
+    ), 'sigungu', ('서울', '성북구')),
+
+    # 송파구
+    ((
+        '잠실나루역', '잠실역', '잠실새내역', '종합운동장역', '가락시장역', '경찰병원역', '오금역', '올림픽공원역', '방이역', '개롱역', '거여역', '마천역',
+        '몽촌토성역', '석촌역', '송파역', '문정역', '장지역', '복정역', '삼전역', '석촌고분역', '송파나루역', '한성백제역', '송파구'
+    ), 'sigungu', ('서울', '송파구')),
+
+    # 양천구
+    (('양천구청역', '신정네거리역', '신정역', '목동역', '오목교역', '신목동역', '양천구'), 'sigungu', ('서울', '양천구')),
+
+    # 영등포구
+    ((
+        '영등포역', '신길역', '대방역', '문래역', '영등포구청역', '당산역', '양평역', '영등포시장역', '여의도역', '여의나루역', '보라매역', '신풍역',
+        '선유도역', '국회의사당역', '샛강역', '서울지방병무청역', '영등포구'
+    ), 'sigungu', ('서울', '영등포구')),
+
+    # 용산구
+    ((
+        '용산역', '남영역', '서울역', '이촌역', '신용산역', '삼각지역', '숙대입구역', '한강진역', '이태원f역', '녹사평역', '효창공원앞역', '서빙고역',
+        '한남역', '용산구'
+    ), 'sigungu', ('서울', '용산구')),
+
+    # 은평구
+    ((
+        '구파발역', '연신내역', '불광역', '녹번역', '디지털미디어시티역', '증산역', '새절역', '응암역', '구산역', '독바위역', '역촌역', '응암역', '수색역',
+        '은평구'
+    ), 'sigungu', ('서울', '은평구')),
+
+    # 종로구
+    ((
+        '종각역', '종로3가역', '종로5가역', '동대문역', '동묘앞역', '독립문역', '경복궁역', '안국역', '혜화역', '광화문역', '창신역', '종로구'
+    ), 'sigungu', ('서울', '종로구')),
+
+    # 중구
+    ((
+        '서울역', '시청역', '을지로입구역', '을지로3가역', '을지로4가역', '동대문역사문화공원역', '신당역', '충무로역', '동대입구역', '약수역', '회현역',
+        '명동역', '청구역', '버티고개역'
+    ), 'sigungu', ('서울', '중구')),
+    (('중구',), 'sigungu', '중구'),
+
+    # 중랑구
+    (('신내역', '봉화산역', '먹골역', '중화역', '상봉역', '면목역', '사가정역', '용마산역', '중랑역', '망우역', '양원역', '중랑구'), 'sigungu', ('서울', '중랑구')),
+
+    # 시설 관련 필터링
+    (('주차공간 있는', '주차가능', '주차', '주차 가능'), 'parking', True),
+    (('주차공간이없는', '주차가불가', '차대는곳 없는', '주차 불가능'), 'parking', False),
+    (('주차불가능', '주차가 불가', '주차못', '주차 못'), 'parking', False),
+
+    (('블론드', '블론드 라떼', '블론드 에스프레소', '블론드 원두'), 'blonde', True),
+    (('블론드 아닌', '블론드 제외', '블론드 제외한', '블론드 없는'), 'blonde', False),
+
+    (('피지오', '피지오 드링크', '피지오 음료', '피지오 커피'), 'physio', True),
+    (('피지오 아닌', '피지오 제외', '피지오 제외한', '피지오 없는'), 'physio', False),
+
+    (('콜드브루', '콜드 브루', '콜드브루 커피', '콜드 브루 커피'), 'coldbrew', True),
+    (('콜드브루 아닌', '콜드브루 제외', '콜드브루 제외한', '콜드브루 없는'), 'coldbrew', False),
+
+    (('현금불가', '현금 불가', '현금 사용 불가', '현금 받지 않는'), 'noCash', True),
+    (('현금가능', '현금 가능', '현금 사용 가능', '현금 받는'), 'noCash', False),
+
+    (('외화결제', '외화 결제', '외국 화폐 결제', '외화 사용 가능'), 'foreignCash', True),
+    (('외화결제 불가', '외화 결제 불가', '외국 화폐 사용 불가', '외화 사용 불가능'), 'foreignCash', False),
+
+    (('딜리버스', '딜리버리', '배달 가능한', '배달 되는'), 'deliBus', True),
+    (('딜리버스 아닌', '딜리버리 불가', '배달 불가', '배달 안되는'), 'deliBus', False),
+
+    (('친환경', 'in코', '환경 친화적', '환경 보호'), 'eco', True),
+    (('친환경 아닌', 'in코 아닌', '환경 친화적 아닌', '환경 보호 아닌'), 'eco', False),
+
+    (('오후9시이후영업', '야간영업', '밤에 여는', '밤늦게 여는'), 'close21', True),
+    (('오후9시이후영업 아닌', '야간영업 불가', '밤에 닫는', '일찍 닫는'), 'close21', False),
+
+    (('펫존', '반려동물 존', '애완동물 존', '반려동물 공간'), 'petZone', True),
+    (('펫존 아닌', '반려동물 존 아닌', '애완동물 존 아닌', '반려동물 공간 아닌'), 'petZone', False),
+
+    (('공항', '공항 근처', '공항 근방', '공항 주변'), 'airport', True),
+    (('공항 아닌', '공항 근처 아닌', '공항 근방 아닌', '공항 주변 아닌'), 'airport', False),
+
+    (('해변가', '바닷가', '바다 근처', '해안가'), 'seaside', True),
+    (('해변가 아닌', '바닷가 아닌', '바다 근처 아닌', '해안가 아닌'), 'seaside', False),
+
+    (('대학교', '대학', '대학 근처', '학교 근처'), 'university', True),
+    (('대학교 아닌', '대학 아닌', '대학 근처 아닌', '학교 근처 아닌'), 'university', False),
+
+    (('터미널', '버스터미널', '터미널 근처', '터미널 주변'), 'terminal', True),
+    (('터미널 아닌', '버스터미널 아닌', '터미널 근처 아닌', '터미널 주변 아닌'), 'terminal', False),
+
+    (('리조트', '리조트 근처', '리조트 주변', '휴양지'), 'resort', True),
+    (('리조트 아닌', '리조트 근처 아닌', '리조트 주변 아닌', '휴양지 아닌'), 'resort', False),
+
+    (('병원', '병원 근처', '의료기관', '의료시설'), 'hospital', True),
+    (('병원 아닌', '병원 근처 아닌', '의료기관 아닌', '의료시설 아닌'), 'hospital', False),
+
+    (('매장내', '매장 내', '가게 안', '상점 내'), 'inStore', True),
+    (('매장내 아닌', '매장 내 아닌', '가게 안 아닌', '상점 내 아닌'), 'inStore', False),
+
+    (('지하철', '지하철역', '지하철 근처', '지하철 주변'), 'subway', True),
+    (('지하철 아닌', '지하철역 아닌', '지하철 근처 아닌', '지하철 주변 아닌'), 'subway', False),
+
+    (('장애인편의시설', '장애인 편의 시설', '장애인 접근 가능', '장애인 지원'), 'theDisabled', True),
+    (('장애인편의시설 아닌', '장애인 편의 시설 아닌', '장애인 접근 불가', '장애인 지원 불가'), 'theDisabled', False),
+
+    (('공기청정기', 'in어 클리너', '공기 청정', '공기 정화'), 'airCleaner', True),
+    (('공기청정기 없는', 'in어 클리너 없는', '공기 청정 안 되는', '공기 정화 안 되는'), 'airCleaner', False),
+
+    (('전기차충전소', '전기차 충전', 'EV 충전', '전기차 충전 가능'), 'electricVehicleCharging', True),
+    (('전기차충전소 없는', '전기차 충전 안 되는', 'EV 충전 불가', '전기차 충전 불가능'), 'electricVehicleCharging', False),
+]
+
+
+# 키워드 동시 검색용 Aho-Corasick 오토마톤 (사용자 입력을 한 번만 훑어 포함된 키워드를 모두 찾음)
+class KeywordAutomaton:
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        # 키워드 트라이 구성
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].add(keyword)
+
+        # 실패 링크 구성 (너비 우선 탐색)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    # 텍스트에 포함된 키워드 위치 목록 [(시작, 끝, 키워드)]
+    def find_all(self, text):
+        occurrences = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for keyword in self.output[state]:
+                occurrences.append((end - len(keyword), end, keyword))
+        return occurrences
+
+    # 텍스트에 포함된 키워드 집합 반환
+    # 더 긴 키워드 안에 포함된 짧은 키워드는 제외 (예: '주차 불가능' 안의 '주차', '광주시' 안의 '광주')
+    def find(self, text):
+        occurrences = self.find_all(text)
+        found = set()
+        for start, end, keyword in occurrences:
+            if not any(
+                other_start <= start and end <= other_end and other_end - other_start > end - start
+                for other_start, other_end, _ in occurrences
+            ):
+                found.add(keyword)
+        return found
+
+
+# 주소 행정구역 단위 컬럼
+ADDRESS_LEVELS = ('sido', 'sigungu', 'dong')
+
+
+# 규칙 하나를 매장 불리언 마스크로 변환하는 함수
+def rule_mask(stores, address_index, column, value):
+    if column in ADDRESS_LEVELS:
+        return address_index.mask(column, value)
+    return (stores[column] == value).to_numpy(dtype=bool)
+
+
+# 규칙 테이블을 매장 데이터에 맞춰 컴파일한 필터
+# 키워드별 마스크는 로드 시 한 번만 계산하고, 요청 시에는 키워드 검색 1회 + 마스크 AND 만 수행
+class StoreFilter:
+    def __init__(self, stores, rules=FILTER_RULES):
+        self.rules = rules
+        self.size = len(stores)
+        address_index = AddressIndex(stores['storeAddress'].tolist())
+        masks = [rule_mask(stores, address_index, column, value) for _, column, value in rules]
+
+        self.keyword_rules = {}
+        for rule_id, (keywords, _, _) in enumerate(rules):
+            for keyword in keywords:
+                self.keyword_rules.setdefault(keyword, []).append(rule_id)
+        self.keyword_masks = {
+            keyword: np.logical_or.reduce([masks[rule_id] for rule_id in rule_ids])
+            for keyword, rule_ids in self.keyword_rules.items()
+        }
+        self.automaton = KeywordAutomaton(self.keyword_rules)
+
+    # 매장 변경을 반영한 새 필터 (기존 필터는 그대로 두어, 읽는 쪽은 변경 전 스냅샷을 계속 사용)
+    # stores: 변경 후 매장 데이터 (앞쪽 len(keep_rows) 행이 기존 keep_rows 행), changed_rows: 새로 계산할 행 번호
+    # 변경된 행만 규칙을 다시 평가하고, 나머지 행은 기존 키워드 마스크를 그대로 옮김
+    def patched(self, stores, keep_rows, changed_rows):
+        changed = StoreFilter(stores.iloc[changed_rows], self.rules)
+        patched = copy.copy(self)
+        patched.size = len(stores)
+        patched.keyword_masks = {}
+        for keyword, mask in self.keyword_masks.items():
+            new_mask = np.zeros(len(stores), dtype=bool)
+            new_mask[:len(keep_rows)] = mask[keep_rows]
+            new_mask[changed_rows] = changed.keyword_masks[keyword]
+            patched.keyword_masks[keyword] = new_mask
+        return patched
+
+    # 사용자 입력에 걸리는 조건 목록: 키워드별 (OR 로 묶인) 규칙 번호 튜플
+    def match_rules(self, user_input):
+        return sorted({tuple(self.keyword_rules[keyword]) for keyword in self.automaton.find(user_input)})
+
+    # 사용자 입력이 뜻하는 필터 조건 (규칙 번호 대신 (컬럼, 값) 으로 표현, 순서 무관한 정규형)
+    # 예: '주차 가능한 강남역' 과 '강남구 주차' 는 같은 조건
+    def match_predicates(self, user_input):
+        return sorted({
+            tuple(sorted((self.rules[rule_id][1], self.rules[rule_id][2]) for rule_id in rule_ids))
+            for rule_ids in self.match_rules(user_input)
+        }, key=repr)
+
+    # 사용자 입력에 해당하는 매장 마스크 (걸리는 규칙이 없으면 전체 매장)
+    def mask(self, user_input):
+        mask = np.ones(self.size, dtype=bool)
+        for keyword in self.automaton.find(user_input):
+            mask &= self.keyword_masks[keyword]
+        return mask
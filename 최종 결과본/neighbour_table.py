@@ -0,0 +1,73 @@
+import numpy as np
+
+# 전수 비교 시 한 번에 계산할 어휘 행 수
+CHUNK_SIZE = 1024
+
+
+# 어휘 단어 → 유사 단어(유사도 threshold 이상) 인접 목록 표
+# CSR 형태: neighbours[offsets[i]:offsets[i + 1]] 이 i 번째 단어의 이웃 행 번호 (자기 자신 포함)
+class NeighbourTable:
+    def __init__(self, offsets, neighbours, threshold):
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.threshold = threshold
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def neighbours_of(self, row):
+        return self.neighbours[self.offsets[row]:self.offsets[row + 1]]
+
+    # 여러 어휘 행의 이웃을 합친 어휘 마스크 (match_vocabulary 와 같은 형태)
+    def mask(self, rows):
+        mask = np.zeros(len(self), dtype=bool)
+        for row in rows:
+            mask[self.neighbours_of(row)] = True
+        return mask
+
+    # 어휘 뒤에 새 단어들이 추가된 표 (기존 표는 그대로)
+    # new_neighbours: 새 단어별 이웃 행 번호 배열 (전체 어휘 기준), 유사도는 대칭이므로 기존 단어의 목록에도 새 단어를 추가
+    def extended(self, new_neighbours):
+        old_size = len(self)
+        additions = [[] for _ in range(old_size)]
+        for row, neighbours in enumerate(new_neighbours, old_size):
+            for neighbour in neighbours[neighbours < old_size]:
+                additions[neighbour].append(row)
+
+        lists = [np.union1d(self.neighbours_of(row), additions[row]) for row in range(old_size)]
+        lists += [np.union1d(neighbours, [row]) for row, neighbours in enumerate(new_neighbours, old_size)]
+        offsets = np.concatenate([[0], np.cumsum([len(neighbours) for neighbours in lists])]).astype(np.int64)
+        neighbours = np.concatenate(lists).astype(np.int32) if lists else np.zeros(0, dtype=np.int32)
+        return NeighbourTable(offsets, neighbours, self.threshold)
+
+    def save(self, path):
+        np.savez(path, offsets=self.offsets, neighbours=self.neighbours, threshold=self.threshold)
+
+    # 저장된 표 불러오기 (어휘 수나 기준치가 다르면 None → 다시 생성 필요)
+    @classmethod
+    def load(cls, path, vocab_size, threshold):
+        arrays = np.load(path)
+        if len(arrays['offsets']) - 1 != vocab_size or float(arrays['threshold']) != threshold:
+            return None
+        return cls(arrays['offsets'], arrays['neighbours'], float(arrays['threshold']))
+
+
+# 오프라인 생성: 어휘 전체에 대해 유사도 threshold 이상인 이웃을 계산
+# index 를 주면 (IVFIndex) 근사 반경 검색, 없으면 정규화된 벡터의 전수 비교를 나눠서 수행
+def build_neighbour_table(vocab_matrix, threshold, index=None):
+    offsets = [0]
+    chunks = []
+    for start in range(0, len(vocab_matrix), CHUNK_SIZE):
+        queries = vocab_matrix[start:start + CHUNK_SIZE]
+        if index is not None:
+            found = index.range_search(queries, threshold)
+        else:
+            found = [np.flatnonzero(similarities >= threshold) for similarities in queries @ vocab_matrix.T]
+        for row, neighbours in enumerate(found, start):
+            neighbours = np.union1d(neighbours, [row])  # 근사 검색에서도 자기 자신은 항상 포함
+            chunks.append(neighbours.astype(np.int32))
+            offsets.append(offsets[-1] + len(neighbours))
+        print(f"이웃 목록 생성 진행: {min(start + CHUNK_SIZE, len(vocab_matrix))}/{len(vocab_matrix)}")
+
+    neighbours = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+    return NeighbourTable(np.asarray(offsets, dtype=np.int64), neighbours, threshold)
@@ -0,0 +1,46 @@
+# noun_extractor.py
+# 형태소 분석기 공용 API: 최종 결과본/ 과 3.키워드 분석기 주피터/ 는 각 폴더에서 따로 실행하므로 같은 내용의 복사본을 둠
+# (한쪽을 고치면 다른 쪽도 똑같이 맞출 것)
+
+import threading
+from functools import lru_cache
+
+from konlpy.tag import Okt
+
+# 같은 입력의 명사 추출 결과를 기억할 최대 개수
+NOUN_CACHE_SIZE = 100000
+
+# 워커 프로세스마다 하나만 두고 재사용하는 형태소 분석기 (Okt 생성 시 JVM 브리지 비용이 큼)
+_okt = None
+_okt_lock = threading.Lock()
+
+
+def get_analyzer():
+    global _okt
+    if _okt is None:
+        with _okt_lock:
+            if _okt is None:
+                _okt = Okt()
+    return _okt
+
+
+# 프로세스 시작 시 호출: JVM 시작과 사전 로드를 첫 요청 전에 끝냄
+def warm_up():
+    get_analyzer().pos('스타벅스 매장 명사 추출 준비')
+
+
+# 텍스트 하나의 명사 추출
+def _extract(text):
+    return tuple(word for word, pos in get_analyzer().pos(text) if pos == 'Noun')
+
+
+# 같은 텍스트는 다시 분석하지 않는 명사 추출 (짧은 검색어처럼 반복되는 입력용)
+_extract_cached = lru_cache(maxsize=NOUN_CACHE_SIZE)(_extract)
+
+
+# 여러 텍스트를 한 번에 받아 텍스트별 명사 리스트 반환 (중복 텍스트는 한 번만 분석)
+# memoize=False: 결과를 프로세스 캐시에 남기지 않음 (업로드 본문처럼 길고 한 번만 나오는 텍스트가 캐시를 채우지 않도록)
+def extract_nouns_batch(texts, memoize=True):
+    extract = _extract_cached if memoize else _extract
+    unique = {text: extract(text) if isinstance(text, str) else () for text in dict.fromkeys(texts)}
+    return [list(unique[text]) for text in texts]
@@ -0,0 +1,221 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# 디스크 단계 정리(폴더 다시 읽기 + 예산 초과분 삭제)를 여러 프로세스가 동시에 하지 않도록 잡는 잠금 파일
+LOCK_FILE = '.lock'
+
+
+# 캐시 키 생성 함수: 데이터 버전, 불용어, 유사도 기준치, 결과 개수, 시작 위치, 기타 계산 옵션이 바뀌면 다른 키가 됨
+def make_cache_key(query, data_version, stopwords, threshold, top_n, offset=0, options=None):
+    payload = json.dumps(
+        {
+            'query': query, 'data': data_version, 'stopwords': sorted(stopwords),
+            'threshold': threshold, 'top_n': top_n, 'offset': offset, 'options': options or {},
+        },
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+# 추천 결과 캐시: 메모리 LRU + 디스크(./cache/<키>.json) 2단계
+# - 디스크는 최대 항목 수 / 최대 바이트 중 하나라도 넘으면 가장 오래 쓰이지 않은 항목부터 삭제
+# - ttl(초)이 지난 항목은 미스로 처리하고 삭제
+# - 디스크 단계는 같은 폴더를 쓰는 워커 프로세스들이 공유: 다른 프로세스가 저장한 항목도 조회되고,
+#   예산은 scan_interval(초)마다 폴더를 다시 읽어 전체 합계 기준으로 맞춤 (그 사이에는 잠시 넘을 수 있음)
+class ResultCache:
+    def __init__(self, cache_dir, max_entries=10000, max_bytes=256 * 1024 * 1024, ttl=7 * 24 * 3600, memory_entries=1024,
+                 scan_interval=60):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.scan_interval = scan_interval
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+        self._memory = OrderedDict()  # 키 → (생성 시각, 결과)
+        self._disk = OrderedDict()    # 키 → 파일 크기 (마지막 사용 순서)
+        self._disk_bytes = 0
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._lock:
+            self._scan_disk()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    # 캐시 조회 (없거나 만료되면 None)
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                created, results = self._memory[key]
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return results
+                self._remove(key)
+                self.stats['expirations'] += 1
+
+            if key not in self._disk:
+                try:
+                    size = os.path.getsize(self._path(key))  # 다른 워커 프로세스가 저장한 항목
+                except OSError:
+                    pass
+                else:
+                    self._disk[key] = size
+                    self._disk_bytes += size
+
+            if key in self._disk:
+                try:
+                    with open(self._path(key), 'r') as cache_file:
+                        entry = json.load(cache_file)
+                    created, results = entry['created'], entry['results']
+                except (OSError, ValueError, KeyError, TypeError):
+                    self._remove(key)  # 손상되었거나 예전 형식의 파일
+                else:
+                    if not self._expired(created):
+                        self._disk.move_to_end(key)
+                        os.utime(self._path(key))
+                        self._remember(key, created, results)
+                        self.stats['disk_hits'] += 1
+                        return results
+                    self._remove(key)
+                    self.stats['expirations'] += 1
+
+            self.stats['misses'] += 1
+            return None
+
+    # 캐시 저장 (tags: 선택적 무효화에 쓰는 결과 계산 정보, 예: 입력/명사/점수 방식)
+    def put(self, key, results, tags=None):
+        created = time.time()
+        payload = json.dumps({'created': created, 'results': results, 'tags': tags})
+        with self._lock:
+            # 임시 파일에 쓴 뒤 교체 (다른 프로세스가 쓰는 도중의 파일을 손상된 항목으로 보고 지우지 않도록)
+            temporary_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(temporary_path, 'w') as cache_file:
+                cache_file.write(payload)
+            os.replace(temporary_path, self._path(key))
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = len(payload.encode())
+            self._disk_bytes += self._disk[key]
+            self._remember(key, created, results)
+            self._evict_disk()
+            if time.time() - self._last_scan > self.scan_interval:
+                self._scan_disk()
+
+    # 특정 키 무효화
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    # 조건부 무효화: affected(tags, results) 가 True 인 항목만 삭제 (tags 가 없는 항목은 삭제), 삭제 수 반환
+    # 판정은 잠금 밖에서 수행 (판정 도중 들어온 새 항목은 건드리지 않음)
+    # 같은 캐시 폴더를 쓰는 다른 프로세스가 저장한 항목도 포함하도록 폴더의 파일 목록으로 확인
+    # 예전 형식(결과 리스트만 저장)이나 손상된 항목은 판정하지 않고 삭제
+    def invalidate_where(self, affected):
+        keys = [file_name[:-5] for file_name in os.listdir(self.cache_dir) if file_name.endswith('.json')]
+        stale = []
+        for key in keys:
+            try:
+                with open(self._path(key), 'r') as cache_file:
+                    entry = json.load(cache_file)
+            except FileNotFoundError:
+                continue  # 이미 삭제된 항목
+            except (OSError, ValueError):
+                stale.append((key, None))
+                continue
+            if not isinstance(entry, dict) or entry.get('tags') is None:
+                stale.append((key, entry.get('created') if isinstance(entry, dict) else None))
+                continue
+            try:
+                is_stale = affected(entry['tags'], entry.get('results'))
+            except (KeyError, TypeError, AttributeError):
+                is_stale = True
+            if is_stale:
+                stale.append((key, entry.get('created')))
+
+        removed = 0
+        with self._lock:
+            for key, created in stale:
+                if self._memory.get(key, (created,))[0] != created:
+                    continue
+                if key in self._disk:
+                    self._remove(key)
+                else:
+                    try:
+                        os.remove(self._path(key))  # 다른 프로세스가 저장한 항목
+                    except FileNotFoundError:
+                        continue
+                removed += 1
+        return removed
+
+    # 메모리 단계만 비움 (다른 프로세스가 디스크 단계를 무효화한 뒤, 이 프로세스에 남은 이전 결과 제거)
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    # 전체 무효화
+    def clear(self):
+        with self._lock:
+            for key in list(self._disk):
+                self._remove(key)
+            self._memory.clear()
+
+    # 적중/미스/삭제 카운터와 현재 크기
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, memory_entries=len(self._memory), disk_entries=len(self._disk), disk_bytes=self._disk_bytes)
+
+    def _remember(self, key, created, results):
+        self._memory[key] = (created, results)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _remove(self, key):
+        self._memory.pop(key, None)
+        if key in self._disk:
+            self._disk_bytes -= self._disk.pop(key)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    # 디스크 단계 색인을 캐시 폴더에서 다시 읽고(다른 프로세스의 저장/삭제 반영) 전체 예산 초과분 삭제
+    # 파일 수정 시각이 마지막 사용 시각 (적중 시 os.utime), self._lock 을 잡은 상태에서 호출
+    def _scan_disk(self):
+        with open(os.path.join(self.cache_dir, LOCK_FILE), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                entries = []
+                for file_name in os.listdir(self.cache_dir):
+                    if file_name.endswith('.json'):
+                        try:
+                            stat = os.stat(os.path.join(self.cache_dir, file_name))
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, file_name[:-5], stat.st_size))
+                self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+                self._disk_bytes = sum(self._disk.values())
+                self._evict_disk()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self._last_scan = time.time()
+
+    def _evict_disk(self):
+        while self._disk and (len(self._disk) > self.max_entries or self._disk_bytes > self.max_bytes):
+            key = next(iter(self._disk))
+            self._remove(key)
+            self.stats['evictions'] += 1
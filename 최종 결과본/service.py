@@ -0,0 +1,224 @@
+# service.py
+# 추천 모델 API 서버: python service.py  (또는 uvicorn service:app --workers N, 이 폴더에서 실행)
+
+import asyncio
+import hmac
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Literal
+
+import uvicorn
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+# 추천 모델 스크립트 경로 (모듈 이름으로 import 할 수 없는 파일명이라 경로로 불러옴)
+RECOMMENDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '(본)스타벅스추천모델.py')
+
+# 동시 처리 설정: 계산용 스레드 수, 동시에 계산하는 요청 수, 대기할 수 있는 요청 수
+WORKER_THREADS = 4
+MAX_CONCURRENCY = 4
+MAX_QUEUE_DEPTH = 32
+
+# 배치 추천 요청 한 번에 받을 수 있는 최대 입력 수
+MAX_BATCH_QUERIES = 10000
+
+# 클라이언트 연결 끊김 확인 간격(초)
+DISCONNECT_POLL_INTERVAL = 0.1
+
+# 관리 API(/stores/update) 공유 비밀값: 요청 헤더 X-Admin-Token 과 같아야 실행 (환경변수가 없으면 관리 API 비활성화)
+ADMIN_TOKEN = os.environ.get('RECOMMENDER_ADMIN_TOKEN')
+
+# 추천 모델 스크립트 불러오기 (설정과 함수만 정의됨, 모델/캐시 준비는 load_recommender 에서 init() 으로)
+def import_recommender():
+    spec = importlib.util.spec_from_file_location('starbucks_recommender', RECOMMENDER_PATH)
+    recommender = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(recommender)
+    return recommender
+
+
+# 요청 기본값과 점수 방식 목록은 CLI/캐시 키와 같은 추천 모델 설정(TOP_N, SCORING_MODE, SCORING_MODES)에서 가져옴
+recommender_module = import_recommender()
+ScoringMode = Literal[recommender_module.SCORING_MODES]
+
+app = FastAPI()
+executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix='recommender')
+
+# 서버 상태: 모델/카탈로그/어휘 색인 로드가 끝나야 ready
+state = {'recommender': None, 'ready': False, 'error': None, 'waiting': 0}
+concurrency = None
+
+
+# top_k: 반환할 매장 수 (모바일 5, 웹 50 등), offset: 페이지 시작 위치 (이전 응답의 next_offset)
+# scoring: 점수 방식 ('raw', 'relative', 'tfidf', 'bm25', 목록에 없으면 422)
+class RecommendRequest(BaseModel):
+    query: str
+    top_k: int = recommender_module.TOP_N
+    offset: int = 0
+    scoring: ScoringMode = recommender_module.SCORING_MODE
+
+
+class BatchRecommendRequest(BaseModel):
+    queries: list[str]
+    top_k: int = recommender_module.TOP_N
+    scoring: ScoringMode = recommender_module.SCORING_MODE
+
+
+# upserts: 추가/수정할 매장 (Store_Name 필수, 주소/플래그 컬럼, frequency: 명사 빈도), removals: 삭제할 매장 이름
+class StoreUpdateRequest(BaseModel):
+    upserts: list[dict] = []
+    removals: list[str] = []
+
+
+# 계산 도중 클라이언트가 연결을 끊은 경우
+class ClientDisconnected(Exception):
+    pass
+
+
+# 추천 모델 로드 (KoBERT, 형태소 분석기, 매장 카탈로그, 어휘 색인) - 별도 스레드에서 실행
+def load_recommender():
+    try:
+        recommender_module.init()
+        recommender_module.load_store_catalog()
+        state['recommender'] = recommender_module
+        state['ready'] = True
+        print("추천 모델 준비 완료")
+    except Exception as e:
+        state['error'] = repr(e)
+        print(f"추천 모델 로드 실패: {e}")
+
+
+@app.on_event("startup")
+async def startup():
+    global concurrency
+    concurrency = asyncio.Semaphore(MAX_CONCURRENCY)
+    # 모델 로드가 끝나기 전에도 서버는 떠 있고, /ready 가 준비 여부를 알려줌
+    threading.Thread(target=load_recommender, daemon=True).start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 프로세스 생존 확인
+@app.get("/health")
+async def health():
+    return {'status': 'ok'}
+
+
+# 로드밸런서 준비 확인: 모델, 카탈로그, 어휘 색인이 모두 로드된 뒤에만 200
+@app.get("/ready")
+async def ready():
+    if state['ready']:
+        return {'ready': True}
+    return JSONResponse({'ready': False, 'error': state['error']}, status_code=503)
+
+
+# 운영 지표: 임베딩 마이크로 배치 (배치 크기, 대기 시간), 추천 결과 캐시 적중률
+@app.get("/metrics")
+async def metrics():
+    recommender = get_recommender()
+    return {
+        'embedding_batcher': recommender.embedding_batcher.get_metrics(),
+        'result_cache': recommender.result_cache.get_stats(),
+        'waiting': state['waiting'],
+    }
+
+
+# 계산 작업을 스레드 풀에서 실행하고, 클라이언트 연결이 끊기면 취소
+# function 은 cancel(threading.Event) 인자를 받아 단계 사이에서 확인함 (실행 중인 작업도 다음 단계 전에 멈춤)
+# cancellable=False 인 작업(매장 업데이트)은 연결이 끊겨도 끝까지 실행
+# 동시 처리 슬롯은 스레드의 작업이 실제로 끝날 때 반환 (연결이 끊긴 작업이 스레드를 쓰는 동안 새 요청이 몰리지 않도록)
+async def run_in_pool(request, function, *args, cancellable=True):
+    loop = asyncio.get_running_loop()
+    cancel = threading.Event()
+    try:
+        task = executor.submit(partial(function, *args, cancel=cancel) if cancellable else partial(function, *args))
+    except BaseException:
+        concurrency.release()
+        raise
+    task.add_done_callback(lambda _: loop.call_soon_threadsafe(concurrency.release))
+    future = asyncio.wrap_future(task)
+    if not cancellable:
+        return await asyncio.shield(future)
+    while True:
+        done, _ = await asyncio.wait({future}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return future.result()
+        if await request.is_disconnected():
+            cancel.set()  # 실행 중이면 다음 단계 전에 중단
+            task.cancel()  # 아직 시작 전이면 실행되지 않음
+            future.cancel()
+            raise ClientDisconnected()
+
+
+# 로드가 끝난 추천 모델 모듈 (준비 전이면 503)
+def get_recommender():
+    if not state['ready']:
+        raise HTTPException(status_code=503, detail="추천 모델을 불러오는 중입니다.")
+    return state['recommender']
+
+
+# 동시 처리 제한 + 대기열 길이 제한을 거쳐 계산 실행 (획득한 슬롯은 run_in_pool 의 작업이 끝날 때 반환)
+async def run_limited(request, function, *args, cancellable=True):
+    if state['waiting'] >= MAX_QUEUE_DEPTH:
+        raise HTTPException(status_code=503, detail="요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도하세요.")
+
+    state['waiting'] += 1
+    try:
+        await concurrency.acquire()
+    finally:
+        state['waiting'] -= 1
+    return await run_in_pool(request, function, *args, cancellable=cancellable)
+
+
+@app.post("/recommend")
+async def recommend(request: Request, body: RecommendRequest):
+    recommender = get_recommender()
+    try:
+        page = await run_limited(request, recommender.recommend_page, body.query, body.top_k, body.offset, body.scoring)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientDisconnected:
+        return Response(status_code=499)
+    return {'query': body.query, **page}
+
+
+# 여러 입력을 한 번에 추천 (명사가 없는 입력의 결과는 null)
+@app.post("/recommend/batch")
+async def recommend_batch(request: Request, body: BatchRecommendRequest):
+    if len(body.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_QUERIES}개까지 요청할 수 있습니다.")
+    recommender = get_recommender()
+    try:
+        pages = await run_limited(request, recommender.recommend_batch, body.queries, body.top_k, None, body.scoring)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientDisconnected:
+        return Response(status_code=499)
+    return {'results': [{'query': query, **page} if page else None for query, page in zip(body.queries, pages)]}
+
+
+# 매장 증분 업데이트 (이 워커 프로세스의 색인과 디스크 카탈로그/색인을 갱신하고 변경 번호를 기록,
+# --workers N 의 다른 워커는 다음 요청에서 변경 번호를 보고 저장본을 다시 불러옴)
+# 추천 요청과 같은 동시 처리/대기열 제한을 거치고, 업데이트 도중 연결이 끊겨도 중간에 멈추지 않도록 취소 없이 끝까지 실행
+@app.post("/stores/update")
+async def update_stores(request: Request, body: StoreUpdateRequest, x_admin_token: str | None = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="관리 API 가 비활성화되어 있습니다.")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="관리 토큰이 올바르지 않습니다.")
+    recommender = get_recommender()
+    try:
+        return await run_limited(request, recommender.update_stores, body.upserts, body.removals, cancellable=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# FastAPI 서버 실행
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=8000)
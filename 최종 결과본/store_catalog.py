@@ -0,0 +1,273 @@
+import ast
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, diags, vstack
+
+from term_matrix import SCORING_MODES, build_scoring_matrices, build_term_matrix
+from vocab_index import collect_vocabulary
+
+# 매장을 구분하는 컬럼 (증분 업데이트의 키)
+STORE_KEY = 'Store_Name'
+
+# 카탈로그 바이너리 저장 경로
+CATALOG_DIR = './data/catalog'
+CATALOG_META_FILE = 'meta.json'
+CATALOG_STORES_FILE = 'stores.pkl'
+CATALOG_MATRIX_FILE = 'term_matrix.npz'
+CATALOG_REVISION_FILE = 'revision'
+CATALOG_LOCK_FILE = 'update.lock'
+
+
+# 매장 카탈로그: 매장 정보(빈도 컬럼 제외), 단어 목록, 매장×단어 희소 빈도 행렬
+# scoring_matrices 는 점수 방식별 가중치 행렬 (없으면 빈도 행렬에서 계산)
+# data_version 은 원본 CSV 내용의 해시 (결과 캐시 키에 사용)
+class StoreCatalog:
+    def __init__(self, stores, terms, term_matrix, source_mtime, data_version, scoring_matrices=None):
+        self.stores = stores
+        self.terms = terms
+        self.term_index = {term: column for column, term in enumerate(terms)}
+        self.term_matrix = term_matrix
+        self.scoring_matrices = scoring_matrices or build_scoring_matrices(term_matrix)
+        self.source_mtime = source_mtime
+        self.data_version = data_version
+
+    # 점수 방식별 가중치 행렬 ('raw' 는 빈도 행렬)
+    def scoring_matrix(self, mode):
+        if mode not in self.scoring_matrices:
+            raise ValueError(f"점수 방식은 {', '.join(SCORING_MODES)} 중 하나로 입력하세요.")
+        return self.scoring_matrices[mode]
+
+
+# 원본 파일 내용 해시 함수
+def file_version(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 원본 CSV 를 한 번만 파싱하여 카탈로그 생성 (frequency 컬럼의 literal_eval 은 여기서만 수행)
+def build_catalog(source_path):
+    data = pd.read_csv(source_path)
+    frequency_dicts = [ast.literal_eval(frequency) for frequency in data['frequency']]
+    terms = collect_vocabulary(frequency_dicts)
+    term_matrix = build_term_matrix(frequency_dicts, {term: column for column, term in enumerate(terms)})
+    stores = data.drop(columns=['frequency']).reset_index(drop=True)
+    return StoreCatalog(stores, terms, term_matrix, os.path.getmtime(source_path), file_version(source_path))
+
+
+# 카탈로그를 바이너리(numpy 배열 + 단어 사전 + pickle)로 저장하는 함수
+def save_catalog(catalog, catalog_dir=CATALOG_DIR):
+    os.makedirs(catalog_dir, exist_ok=True)
+    matrix = catalog.term_matrix
+    np.savez(
+        os.path.join(catalog_dir, CATALOG_MATRIX_FILE),
+        data=matrix.data, indices=matrix.indices, indptr=matrix.indptr, shape=np.asarray(matrix.shape),
+        **{f'data_{mode}': scored.data for mode, scored in catalog.scoring_matrices.items()},
+    )
+    catalog.stores.to_pickle(os.path.join(catalog_dir, CATALOG_STORES_FILE))
+    with open(os.path.join(catalog_dir, CATALOG_META_FILE), 'w', encoding='utf-8') as meta_file:
+        json.dump(
+            {'source_mtime': catalog.source_mtime, 'data_version': catalog.data_version, 'terms': catalog.terms},
+            meta_file, ensure_ascii=False,
+        )
+
+
+# 저장된 바이너리 카탈로그 불러오기 (원본 CSV 수정 시각과 다르면 None 반환)
+def load_saved_catalog(source_path, catalog_dir=CATALOG_DIR):
+    meta_path = os.path.join(catalog_dir, CATALOG_META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as meta_file:
+        meta = json.load(meta_file)
+    if meta['source_mtime'] != os.path.getmtime(source_path) or 'data_version' not in meta:
+        return None
+
+    arrays = np.load(os.path.join(catalog_dir, CATALOG_MATRIX_FILE))
+    shape = tuple(arrays['shape'])
+    term_matrix = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape)
+    scoring_matrices = None
+    if all(f'data_{mode}' in arrays for mode in SCORING_MODES):
+        scoring_matrices = {
+            mode: csr_matrix((arrays[f'data_{mode}'], term_matrix.indices, term_matrix.indptr), shape=shape)
+            for mode in SCORING_MODES
+        }
+    stores = pd.read_pickle(os.path.join(catalog_dir, CATALOG_STORES_FILE))
+    return StoreCatalog(stores, meta['terms'], term_matrix, meta['source_mtime'], meta['data_version'], scoring_matrices)
+
+
+# 카탈로그 불러오기: 최신 바이너리가 있으면 사용하고, 없으면 CSV 에서 생성 후 저장
+def load_catalog(source_path, catalog_dir=CATALOG_DIR):
+    catalog = load_saved_catalog(source_path, catalog_dir)
+    if catalog is None:
+        print("매장 카탈로그 생성 중 (원본 CSV 파싱)...")
+        catalog = build_catalog(source_path)
+        save_catalog(catalog, catalog_dir)
+    return catalog
+
+
+# 매장 추가/수정/삭제를 반영한 새 카탈로그 생성 (기존 카탈로그는 바꾸지 않음)
+# upserts: 매장 정보 딕셔너리 목록 (STORE_KEY 필수, 'frequency' 는 명사 빈도 딕셔너리, 없는 컬럼은 기존 값 유지)
+# removals: 삭제할 매장 키 목록
+# 반환: (새 카탈로그, 남긴 기존 행 번호, 새 카탈로그에서 다시 계산할 행 번호, 변경/삭제된 기존 행 번호)
+# 새 카탈로그의 앞쪽 len(keep_rows) 행은 기존 keep_rows 행 순서 그대로, 새 매장은 뒤에 추가
+def apply_store_changes(catalog, upserts=(), removals=()):
+    if any(STORE_KEY not in store for store in upserts):
+        raise ValueError(f"추가/수정할 매장에는 {STORE_KEY} 가 필요합니다.")
+    row_of = {key: row for row, key in enumerate(catalog.stores[STORE_KEY])}
+    missing = [key for key in removals if key not in row_of]
+    if missing:
+        raise ValueError(f"없는 매장입니다: {', '.join(missing)}")
+    removed = set(removals)
+    upserts = {store[STORE_KEY]: store for store in upserts}
+
+    keep_rows = np.array([row for row, key in enumerate(catalog.stores[STORE_KEY]) if key not in removed], dtype=np.int64)
+    stores = catalog.stores.iloc[keep_rows].reset_index(drop=True)
+    new_row_of = {key: row for row, key in enumerate(stores[STORE_KEY])}
+
+    added = [store for key, store in upserts.items() if key not in new_row_of]
+    for key, store in upserts.items():
+        if key in new_row_of:
+            for column, value in store.items():
+                if column != 'frequency':
+                    stores.at[new_row_of[key], column] = value
+    if added:
+        stores = pd.concat(
+            [stores, pd.DataFrame([{k: v for k, v in store.items() if k != 'frequency'} for store in added])],
+            ignore_index=True,
+        )
+    updated_rows = [new_row_of[key] for key in upserts if key in new_row_of]
+    changed_rows = np.array(sorted(updated_rows) + list(range(len(keep_rows), len(stores))), dtype=np.int64)
+
+    # 새로 나온 명사는 단어 열 뒤에 추가 (기존 열 번호 유지)
+    terms = list(catalog.terms)
+    term_index = dict(catalog.term_index)
+    for store in upserts.values():
+        for term in store.get('frequency', {}):
+            if term not in term_index:
+                term_index[term] = len(terms)
+                terms.append(term)
+
+    # 빈도 행렬: 남긴 행을 옮기고, frequency 가 바뀐 행은 비운 뒤 새 빈도를 더하고, 새 매장 행은 뒤에 붙임
+    base = catalog.term_matrix[keep_rows]
+    base = csr_matrix((base.data, base.indices, base.indptr), shape=(len(keep_rows), len(terms)))
+    replaced = np.ones(len(keep_rows), dtype=np.float32)
+    patch = [{} for _ in range(len(keep_rows))]
+    for key, store in upserts.items():
+        if key in new_row_of and 'frequency' in store:
+            replaced[new_row_of[key]] = 0
+            patch[new_row_of[key]] = store['frequency']
+    base = diags(replaced) @ base + build_term_matrix(patch, term_index)
+    base.eliminate_zeros()
+    term_matrix = vstack([base, build_term_matrix([store.get('frequency', {}) for store in added], term_index)], format='csr')
+
+    old_rows = sorted(row_of[key] for key in set(removals) | set(upserts) if key in row_of)
+    updated = StoreCatalog(stores, terms, term_matrix, catalog.source_mtime, catalog.data_version)
+    return updated, keep_rows, changed_rows, np.array(old_rows, dtype=np.int64)
+
+
+# 프로세스 전역 카탈로그 (원본 CSV 수정 시각이 바뀌면 자동으로 다시 불러옴)
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog(source_path, catalog_dir=CATALOG_DIR):
+    global _catalog
+    source_mtime = os.path.getmtime(source_path)
+    if _catalog is not None and _catalog.source_mtime == source_mtime:
+        return _catalog
+
+    with _catalog_lock:
+        if _catalog is None or _catalog.source_mtime != source_mtime:
+            _catalog = load_catalog(source_path, catalog_dir)
+            print(f"매장 카탈로그 로드 완료: 매장 {_catalog.term_matrix.shape[0]}개, 단어 {len(_catalog.terms)}개")
+    return _catalog
+
+
+# 프로세스 전역 카탈로그를 증분 업데이트된 카탈로그로 교체
+# (save_catalog 로 함께 저장해 두면 원본 CSV 가 바뀌기 전까지 재시작 후에도 유지)
+def replace_catalog(catalog):
+    global _catalog
+    with _catalog_lock:
+        _catalog = catalog
+
+
+# 저장된 카탈로그의 변경 번호 (없으면 None)
+# 증분 업데이트를 저장한 프로세스가 새 번호를 기록하고, 다른 프로세스(uvicorn 워커)는 번호가 바뀌면 저장본을 다시 불러옴
+def read_revision(catalog_dir=CATALOG_DIR):
+    try:
+        with open(os.path.join(catalog_dir, CATALOG_REVISION_FILE), 'r', encoding='utf-8') as revision_file:
+            return revision_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# 새 변경 번호 기록 (임시 파일에 쓴 뒤 교체하므로 읽는 쪽은 이전 번호나 새 번호만 봄)
+def publish_revision(catalog_dir=CATALOG_DIR):
+    revision = uuid.uuid4().hex
+    os.makedirs(catalog_dir, exist_ok=True)
+    temporary_path = os.path.join(catalog_dir, CATALOG_REVISION_FILE + '.tmp')
+    with open(temporary_path, 'w', encoding='utf-8') as revision_file:
+        revision_file.write(revision)
+    os.replace(temporary_path, os.path.join(catalog_dir, CATALOG_REVISION_FILE))
+    return revision
+
+
+# 프로세스 간 카탈로그 쓰기 잠금: 저장본을 바꾸거나 다시 불러오는 동안 다른 프로세스는 대기
+# (같은 프로세스 안에서 중첩해서 잡으면 교착되므로 한 번만)
+@contextmanager
+def catalog_write_lock(catalog_dir=CATALOG_DIR):
+    os.makedirs(catalog_dir, exist_ok=True)
+    with open(os.path.join(catalog_dir, CATALOG_LOCK_FILE), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# 스냅샷 읽기/쓰기 잠금: 요청 처리(읽기)는 동시에 여러 개, 스냅샷 교체(쓰기)는 진행 중인 읽기가 끝난 뒤 단독으로
+# 교체를 기다리는 동안 새 읽기는 대기 (교체 자체는 전역 변수 대입뿐이라 짧음)
+class SnapshotLock:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+
+    @contextmanager
+    def reading(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._condition:
+            while self._writing:
+                self._condition.wait()
+            self._writing = True
+            while self._readers:
+                self._condition.wait()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
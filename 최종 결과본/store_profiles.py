@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+from scipy.sparse import diags
+
+from term_matrix import score_stores, select_top_k
+from vocab_index import normalize_rows
+
+# 매장 프로필 벡터 저장 파일 (카탈로그 디렉토리 안)
+STORE_PROFILE_FILE = 'store_profiles.npz'
+
+
+# 단어 가중치 행렬: 'frequency' 는 빈도 그대로, 'tfidf' 는 빈도 × log(매장 수 / 단어가 나온 매장 수) 역빈도
+def term_weights(term_matrix, weighting='tfidf'):
+    if weighting == 'frequency':
+        return term_matrix
+    if weighting == 'tfidf':
+        document_frequency = np.bincount(term_matrix.indices, minlength=term_matrix.shape[1])
+        idf = np.log((1 + term_matrix.shape[0]) / (1 + document_frequency)) + 1
+        return term_matrix @ diags(idf.astype(np.float32))
+    raise ValueError(f"알 수 없는 가중치 방식: {weighting}")
+
+
+# 매장 프로필 벡터: 매장 명사 임베딩의 가중 평균 (L2 정규화, 내적 = 코사인 유사도)
+# term_vectors 는 카탈로그 단어 순서의 정규화된 임베딩 (어휘 행렬[catalog_vocab_rows])
+def build_store_profiles(term_matrix, term_vectors, weighting='tfidf'):
+    weighted = term_weights(term_matrix, weighting)
+    return normalize_rows(weighted @ term_vectors)
+
+
+def save_store_profiles(path, profiles, data_version, weighting):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    np.savez(path, profiles=profiles, data_version=data_version, weighting=weighting)
+
+
+# 저장된 프로필 불러오기 (카탈로그 버전이나 가중치 방식이 다르면 None → 다시 생성 필요)
+def load_store_profiles(path, data_version, weighting):
+    if not os.path.exists(path):
+        return None
+    arrays = np.load(path)
+    if str(arrays['data_version']) != data_version or str(arrays['weighting']) != weighting:
+        return None
+    return arrays['profiles']
+
+
+# 1단계 후보 선정: 질의 벡터와 프로필 내적 상위 size 개 매장 행 번호 (rows 안에서, 행 번호 순서 유지)
+def shortlist_stores(profiles, query_vector, rows, size):
+    if len(rows) <= size:
+        return rows
+    similarities = profiles[rows] @ query_vector
+    top = np.argpartition(-similarities, size - 1)[:size]
+    return rows[np.sort(top)]
+
+
+# 후보 선정 재현율: 전체 매장 정확 점수 상위 top_k 중 후보 선정 후 점수 상위 top_k 에 포함된 비율
+# query_vectors: 질의별 정규화된 평균 명사 벡터, term_masks: 질의별 카탈로그 단어 매칭 마스크
+def measure_shortlist_recall(term_matrix, profiles, query_vectors, term_masks, size, top_k):
+    all_rows = np.arange(term_matrix.shape[0])
+    found = 0
+    total = 0
+    for query_vector, term_mask in zip(query_vectors, term_masks):
+        exact = set(select_top_k(score_stores(term_matrix, term_mask), top_k))
+        rows = shortlist_stores(profiles, query_vector, all_rows, size)
+        approximate = set(rows[select_top_k(score_stores(term_matrix, term_mask, rows), top_k)])
+        found += len(exact & approximate)
+        total += len(exact)
+    return {'recall': found / total if total else 1.0, 'shortlist_ratio': min(size, len(all_rows)) / max(len(all_rows), 1)}
@@ -0,0 +1,74 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+# 점수 계산 방식: 빈도 합(raw), 매장 내 상대 빈도(relative), TF-IDF, BM25
+SCORING_MODES = ('raw', 'relative', 'tfidf', 'bm25')
+
+# BM25 파라미터 (빈도 포화 정도, 문서 길이 보정 정도)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+# 매장별 빈도 딕셔너리를 매장×단어 CSR 빈도 행렬로 변환하는 함수
+# 행 = 매장(데이터 순서), 열 = word_index 의 행 번호 (어휘 임베딩 행렬과 같은 순서)
+def build_term_matrix(frequency_dicts, word_index):
+    indptr = [0]
+    indices = []
+    counts = []
+    for frequency_dict in frequency_dicts:
+        for noun, freq in frequency_dict.items():
+            indices.append(word_index[noun])
+            counts.append(freq)
+        indptr.append(len(indices))
+
+    return csr_matrix(
+        (np.asarray(counts, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(frequency_dicts), len(word_index)),
+    )
+
+
+# 점수 방식별 매장×단어 가중치 행렬 (인덱스 생성 시 1회 계산, 희소 구조는 빈도 행렬과 같음)
+# 단어 마스크와의 행렬곱 한 번이 곧 해당 방식의 점수가 되도록 정규화 계수를 값에 미리 곱해 둠
+def build_scoring_matrices(term_matrix, k1=BM25_K1, b=BM25_B):
+    store_count, term_count = term_matrix.shape
+    counts = term_matrix.data.astype(np.float64)
+    lengths = np.asarray(term_matrix.sum(axis=1), dtype=np.float64).ravel()
+    entry_lengths = np.repeat(lengths, np.diff(term_matrix.indptr))
+    document_frequency = np.bincount(term_matrix.indices, minlength=term_count)
+
+    tfidf_idf = np.log((1 + store_count) / (1 + document_frequency)) + 1
+    bm25_idf = np.log(1 + (store_count - document_frequency + 0.5) / (document_frequency + 0.5))
+    average_length = lengths.mean() if store_count and lengths.mean() > 0 else 1.0
+
+    values = {
+        'raw': counts,
+        'relative': counts / np.maximum(entry_lengths, 1),
+        'tfidf': counts * tfidf_idf[term_matrix.indices],
+        'bm25': bm25_idf[term_matrix.indices] * counts * (k1 + 1) / (counts + k1 * (1 - b + b * entry_lengths / average_length)),
+    }
+    return {
+        mode: csr_matrix((data.astype(np.float32), term_matrix.indices, term_matrix.indptr), shape=term_matrix.shape)
+        for mode, data in values.items()
+    }
+
+
+# 매장 점수 계산 함수: 단어 마스크(유사도 기준치 통과 여부)와 희소 행렬곱 1회
+# rows 를 주면 해당 매장 행만 계산 (필터링 결과)
+def score_stores(term_matrix, term_mask, rows=None):
+    if rows is not None:
+        term_matrix = term_matrix[rows]
+    return term_matrix @ np.asarray(term_mask, dtype=np.float32)
+
+
+# 점수 상위 매장 선택 함수: 전체 정렬 없이 부분 선택(argpartition) 후 선택된 후보만 정렬
+# 점수 0 인 매장은 제외, 같은 점수는 행 순서대로, offset 부터 k 개의 위치(scores 기준)를 반환
+def select_top_k(scores, k, offset=0):
+    scores = np.asarray(scores)
+    candidates = np.flatnonzero(scores > 0)
+    need = offset + k
+    if need < len(candidates):
+        kth = len(candidates) - need
+        cutoff = np.partition(scores[candidates], kth)[kth]  # need 번째로 큰 점수
+        candidates = candidates[scores[candidates] >= cutoff]
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][offset:need]
@@ -0,0 +1,87 @@
+import json
+import os
+
+import numpy as np
+
+# 어휘 임베딩 인덱스 저장 경로
+VOCAB_DIR = './data/vocab'
+VOCAB_MATRIX_FILE = 'vocab_embeddings.npy'
+VOCAB_WORDS_FILE = 'vocab_words.json'
+
+
+# 매장별 빈도 딕셔너리에서 전체 어휘(고유 명사) 수집 함수
+def collect_vocabulary(frequency_dicts):
+    vocabulary = set()
+    for frequency_dict in frequency_dicts:
+        vocabulary.update(frequency_dict.keys())
+    return sorted(vocabulary)
+
+
+# 행 단위 L2 정규화 함수 (정규화 후 내적 = 코사인 유사도)
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+# 어휘 전체를 한 번에 임베딩하여 (정규화된 행렬, 단어→행 번호) 인덱스 생성 함수
+# embed_fn 은 단어 리스트를 받아 (단어 수, 차원) 배열을 반환하는 함수 (예: embed_vocabulary)
+def build_vocab_index(words, embed_fn, batch_size=256, vocab_dir=VOCAB_DIR):
+    words = list(words)
+    chunks = []
+    for start in range(0, len(words), batch_size):
+        chunks.append(np.asarray(embed_fn(words[start:start + batch_size]), dtype=np.float32))
+        print(f"어휘 임베딩 진행: {min(start + batch_size, len(words))}/{len(words)}")
+
+    if chunks:
+        vocab_matrix = normalize_rows(np.vstack(chunks))
+    else:
+        vocab_matrix = np.zeros((0, 0), dtype=np.float32)
+    word_index = {word: row for row, word in enumerate(words)}
+
+    save_vocab_index(vocab_matrix, words, vocab_dir)
+    return vocab_matrix, word_index
+
+
+# 어휘 인덱스 뒤에 새 단어 추가 (기존 행 번호는 유지, 기존 행렬/사전은 바꾸지 않고 새로 만들어 반환)
+def extend_vocab_index(vocab_matrix, word_index, new_words, new_vectors, vocab_dir=VOCAB_DIR):
+    vocab_matrix = np.vstack([vocab_matrix, normalize_rows(new_vectors)]) if len(vocab_matrix) else normalize_rows(new_vectors)
+    word_index = dict(word_index)
+    for word in new_words:
+        word_index[word] = len(word_index)
+    save_vocab_index(vocab_matrix, sorted(word_index, key=word_index.get), vocab_dir)
+    return vocab_matrix, word_index
+
+
+# 어휘 인덱스 저장 함수
+def save_vocab_index(vocab_matrix, words, vocab_dir=VOCAB_DIR):
+    os.makedirs(vocab_dir, exist_ok=True)
+    np.save(os.path.join(vocab_dir, VOCAB_MATRIX_FILE), vocab_matrix.astype(np.float32))
+    with open(os.path.join(vocab_dir, VOCAB_WORDS_FILE), 'w', encoding='utf-8') as words_file:
+        json.dump(list(words), words_file, ensure_ascii=False)
+
+
+# 저장된 어휘 인덱스 불러오기 함수 (없으면 None 반환)
+def load_vocab_index(vocab_dir=VOCAB_DIR):
+    matrix_path = os.path.join(vocab_dir, VOCAB_MATRIX_FILE)
+    words_path = os.path.join(vocab_dir, VOCAB_WORDS_FILE)
+    if not (os.path.exists(matrix_path) and os.path.exists(words_path)):
+        return None
+
+    vocab_matrix = np.load(matrix_path)
+    with open(words_path, 'r', encoding='utf-8') as words_file:
+        words = json.load(words_file)
+    word_index = {word: row for row, word in enumerate(words)}
+    return vocab_matrix, word_index
+
+
+# 사용자 명사 벡터와 어휘 전체의 유사도를 한 번의 행렬곱으로 계산하여
+# 기준치 이상인 어휘 위치를 True 로 표시한 마스크 반환
+def match_vocabulary(user_vectors, vocab_matrix, threshold):
+    if len(vocab_matrix) == 0:
+        return np.zeros(0, dtype=bool)
+    similarities = normalize_rows(user_vectors) @ vocab_matrix.T
+    return similarities.max(axis=0) >= threshold